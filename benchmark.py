@@ -0,0 +1,302 @@
+#!/usr/bin/python
+
+"""
+Headless benchmark of the render path.
+
+Every scenario (resolution x text orientation x slideshow on/off) runs in
+its own process under the SDL dummy video driver, so peak RSS and display
+state are measured per scenario. Frame times are reported as p50/p95/p99
+in milliseconds for each stage:
+
+    border      render_text_with_border() of the first text line (legacy path)
+    text_layer  render_text_layer() for a new minute, as main() does once a minute
+    frame       one main loop frame through the compositor: slideshow update, layers, compose, display update
+    draw        one frame through Slideshow.draw() and a full display flip (immediate-mode path)
+
+Usage:
+    ./benchmark.py                          run every scenario and print a table
+    ./benchmark.py --save-baseline base.json
+    ./benchmark.py --baseline base.json     exit with status 1 if any p95 or peak RSS regressed
+    ./benchmark.py --outline                compare outline() with the legacy per-offset blits across font sizes
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import resource
+import tempfile
+import subprocess
+import configparser
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+RESOLUTIONS = {'800x480': (800, 480), '3840x2160': (3840, 2160)}
+ORIENTATIONS = ('horizontal', 'vertical')
+STAGES = ('border', 'text_layer', 'frame', 'draw')
+# Seconds allowed for the slideshow to decode its photos before measuring
+WARMUP_TIMEOUT = 30
+# Font sizes of the outline benchmark: 800x480 and 4K sizes of both orientations, and beyond
+OUTLINE_FONT_SIZES = (24, 40, 64, 96, 128, 160, 200, 256)
+
+def scenario_names():
+    return [f"{resolution}-{orientation}-{'slideshow' if slideshow else 'text'}"
+            for resolution in RESOLUTIONS for orientation in ORIENTATIONS for slideshow in (False, True)]
+
+def percentiles(samples):
+    """Return p50/p95/p99 and the mean of a list of seconds, in milliseconds."""
+    samples = sorted(samples)
+    def pick(fraction):
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000
+    return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99),
+            'mean': sum(samples) / len(samples) * 1000, 'samples': len(samples)}
+
+def peak_rss_kb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def default_font_path():
+    """The font from config.ini if it exists, else None for pygame's default font."""
+    config = configparser.ConfigParser()
+    config.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'))
+    font_path = config.get('Font', 'font_file', fallback=None)
+    if font_path and os.path.isfile(font_path):
+        return font_path
+    return None
+
+def make_photos(directory, count=3, size=(4000, 3000)):
+    """Write camera-sized JPEG test photos, each a different gradient."""
+    for i in range(count):
+        photo = pygame.Surface(size)
+        for x in range(0, size[0], 40):
+            photo.fill(((x * 255 // size[0] + i * 80) % 256, 128, 255 - x * 255 // size[0]), (x, 0, 40, size[1]))
+        pygame.image.save(photo, os.path.join(directory, f"photo{i}.jpg"))
+
+def run_scenario(name, font_path, frames, memory_profile='normal'):
+    """Run one scenario in this process and return its results."""
+    from photo_manager import PhotoManager
+    from slideshow import Slideshow
+    from compositor import Compositor
+    from text_renderer import render_text_with_border, render_text_layer, WHITE, BLACK
+    from hiragana_clock import clock_phrase
+    from display_format import convert_text_layer, surface_bytes
+
+    resolution, orientation, mode = name.split('-')
+    width, height = RESOLUTIONS[resolution]
+    slideshow_enabled = mode == 'slideshow'
+
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    timings = {stage: [] for stage in STAGES}
+    start = datetime.datetime(2026, 10, 17, 16, 0)
+    phrases = [clock_phrase(start + datetime.timedelta(minutes=i)) for i in range(frames)]
+
+    # Legacy whole-string bordered render
+    font = pygame.font.Font(font_path, max(10, height // 8))
+    for phrase in phrases:
+        begin = time.perf_counter()
+        render_text_with_border(font, phrase[:len(phrase) // 4], WHITE, BLACK, max(2, height // 160))
+        timings['border'].append(time.perf_counter() - begin)
+
+    # Text layer, as rendered once a minute (the first call also builds the glyph atlas)
+    for phrase in phrases:
+        begin = time.perf_counter()
+        text_layer = render_text_layer(phrase, font_path, width, height, orientation)
+        timings['text_layer'].append(time.perf_counter() - begin)
+
+    slideshow = None
+    photo_manager = None
+    with tempfile.TemporaryDirectory() as photos_directory:
+        if slideshow_enabled:
+            from surface_cache import SurfaceCache
+            make_photos(photos_directory)
+            photo_manager = PhotoManager(photos_directory=photos_directory)
+            # Transition continuously so every measured frame is a crossfade frame
+            slideshow = Slideshow(screen, photo_manager, 0, prefetch_count=2,
+                                  surface_cache=SurfaceCache(1024 * 1024 * 1024), fade_duration=0.25,
+                                  memory_profile=memory_profile)
+            deadline = time.time() + WARMUP_TIMEOUT
+            shown = set()
+            while len(shown) < 3 and time.time() < deadline:
+                slideshow.update()
+                if slideshow.current_photo is not None:
+                    shown.add(id(slideshow.current_photo))
+                time.sleep(0.01)
+
+        # Kept in the memory profile's format, as main() does
+        text_rect = text_layer.get_bounding_rect()
+        text_layer = convert_text_layer(text_layer, screen, memory_profile)
+        compositor = Compositor(screen, BLACK)
+        compositor.set_layer('text', text_layer, rect=text_rect)
+        compositor.compose()
+        for _ in range(frames):
+            begin = time.perf_counter()
+            if slideshow:
+                slideshow.update()
+                slideshow.set_layers(compositor)
+            dirty_rects = compositor.compose()
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+            timings['frame'].append(time.perf_counter() - begin)
+
+        for _ in range(frames):
+            begin = time.perf_counter()
+            screen.fill(BLACK)
+            if slideshow:
+                slideshow.update()
+                slideshow.draw()
+            screen.blit(text_layer, (0, 0))
+            pygame.display.flip()
+            timings['draw'].append(time.perf_counter() - begin)
+
+        # Pixel memory of the text layer and of every photo held
+        held_bytes = surface_bytes(text_layer)
+        if slideshow:
+            held_bytes += slideshow.memory_usage()[0]
+            slideshow.stop()
+            photo_manager.close()
+
+    pygame.quit()
+    return {'stages': {stage: percentiles(samples) for stage, samples in timings.items()},
+            'peak_rss_kb': peak_rss_kb(), 'surface_kb': held_bytes // 1024}
+
+def run_outline_benchmark(font_path, repeats):
+    """
+    Time outline() against the legacy per-offset blits for the border width
+    of each font size, and check that both draw the same outline.
+    """
+    from outline import outline, _legacy_outline, alpha_difference
+    from text_layout import border_width_for, REFERENCE_CHAR
+    from text_renderer import BLACK
+
+    pygame.font.init()
+    text = REFERENCE_CHAR * 4 if font_path else "Wg@8"
+    print(f"{'font size':>9s} {'border':>6s} {'legacy ms':>10s} {'outline ms':>10s} {'speedup':>8s} "
+          f"{'max alpha diff':>14s} {'mean alpha diff':>15s}")
+    for font_size in OUTLINE_FONT_SIZES:
+        border_width = border_width_for(font_size)
+        mask = pygame.font.Font(font_path, font_size).render(text, True, BLACK)
+        timings = {}
+        for name, function in (('legacy', _legacy_outline), ('outline', outline)):
+            samples = []
+            for _ in range(repeats):
+                begin = time.perf_counter()
+                result = function(mask, border_width)
+                samples.append(time.perf_counter() - begin)
+            timings[name] = (min(samples) * 1000, result)
+        largest, mean = alpha_difference(timings['legacy'][1], timings['outline'][1])
+        print(f"{font_size:9d} {border_width:6d} {timings['legacy'][0]:10.2f} {timings['outline'][0]:10.2f} "
+              f"{timings['legacy'][0] / timings['outline'][0]:7.1f}x {largest:14d} {mean:15.4f}")
+
+def run_all(names, font_path, frames, memory_profile='normal'):
+    """Run each scenario in a child process."""
+    results = {}
+    for name in names:
+        command = [sys.executable, os.path.abspath(__file__), '--scenario', name, '--frames', str(frames),
+                   '--memory-profile', memory_profile]
+        if font_path:
+            command += ['--font', font_path]
+        print(f"Running {name}...", file=sys.stderr)
+        completed = subprocess.run(command, capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            raise SystemExit(f"Scenario {name} failed")
+        # The scenario prints its results as the last line of its output
+        results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+    return results
+
+def print_table(results):
+    print(f"{'scenario':32s} {'stage':10s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'peak RSS MB':>12s} "
+          f"{'surfaces MB':>12s}")
+    for name, result in results.items():
+        for stage in STAGES:
+            timing = result['stages'][stage]
+            memory = ''
+            if stage == STAGES[0]:
+                memory = f"{result['peak_rss_kb'] / 1024:12.1f} {result.get('surface_kb', 0) / 1024:12.1f}"
+            print(f"{name:32s} {stage:10s} {timing['p50']:9.2f} {timing['p95']:9.2f} {timing['p99']:9.2f} {memory}")
+
+def compare(results, baseline, threshold, min_delta=0.5):
+    """
+    Compare results with a saved baseline.
+
+    Args:
+        results: results of this run
+        baseline: results loaded from a baseline file
+        threshold: allowed relative increase, e.g. 0.25 for 25%
+        min_delta: p95 increases below this many milliseconds are treated as noise
+
+    Returns:
+        list of regression descriptions (p95 or peak RSS worse by more than threshold)
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        for stage in STAGES:
+            before = base['stages'][stage]['p95']
+            after = result['stages'][stage]['p95']
+            if after > before * (1 + threshold) and after - before >= min_delta:
+                regressions.append(f"{name} {stage}: p95 {before:.2f} ms -> {after:.2f} ms")
+        before = base['peak_rss_kb']
+        after = result['peak_rss_kb']
+        if after > before * (1 + threshold):
+            regressions.append(f"{name}: peak RSS {before / 1024:.1f} MB -> {after / 1024:.1f} MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the clock render path headlessly.")
+    parser.add_argument('--frames', type=int, default=200, help="frames measured per stage")
+    parser.add_argument('--font', default=None, help="font file (default: config.ini's, else pygame's default font)")
+    parser.add_argument('--only', action='append', default=[], help="run only scenarios containing this text")
+    parser.add_argument('--save-baseline', metavar='FILE', help="save the results as a baseline")
+    parser.add_argument('--baseline', metavar='FILE', help="compare with a saved baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument('--min-delta', type=float, default=0.5, help="ignore p95 increases below this many ms")
+    parser.add_argument('--memory-profile', choices=('normal', 'low'), default='normal',
+                        help="memory profile of the photos and text layer (compare low against a normal baseline)")
+    parser.add_argument('--outline', action='store_true', help="run the outline benchmark across font sizes instead")
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    font_path = args.font or default_font_path()
+    if args.outline:
+        run_outline_benchmark(font_path, repeats=5)
+        return
+    if args.scenario:
+        print(json.dumps(run_scenario(args.scenario, font_path, args.frames, args.memory_profile)))
+        return
+
+    if font_path is None:
+        print("Japanese font not found, using pygame's default font (glyphs render as boxes)", file=sys.stderr)
+    names = [name for name in scenario_names() if not args.only or any(only in name for only in args.only)]
+    results = run_all(names, font_path, args.frames, args.memory_profile)
+    print_table(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
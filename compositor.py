@@ -0,0 +1,118 @@
+import pygame
+import logging
+
+BLACK = (0, 0, 0)
+
+class Layer:
+    def __init__(self):
+        self.surface = None
+        self.pos = (0, 0)
+        self.alpha = None
+        self.rect = None
+
+class Compositor:
+    # Layers are composited bottom to top in this order
+    LAYER_ORDER = ('background', 'transition', 'text')
+
+    def __init__(self, screen, background_color=BLACK):
+        """
+        Retained-mode compositor that only redraws what changed.
+
+        Each layer keeps its surface, position and alpha between frames.
+        Changing a layer marks the area it covered before and after the
+        change as dirty, and compose() repaints and pushes only those
+        rectangles to the display.
+
+        Args:
+            screen: pygame display surface
+            background_color: RGB tuple used behind all layers
+        """
+        self.screen = screen
+        self.background_color = background_color
+        self.layers = {name: Layer() for name in self.LAYER_ORDER}
+        self.dirty_rects = []
+        self.invalidate()
+
+    def set_screen(self, screen):
+        """Switch to a new display surface (e.g. after toggling fullscreen) and redraw everything."""
+        self.screen = screen
+        self.invalidate()
+
+    def invalidate(self, rect=None):
+        """Mark a rectangle (or the whole screen if None) as needing a repaint."""
+        screen_rect = self.screen.get_rect()
+        rect = screen_rect if rect is None else pygame.Rect(rect).clip(screen_rect)
+        if rect.width == 0 or rect.height == 0:
+            return
+
+        # Merge with any overlapping dirty rectangle to keep the list short
+        for i, dirty in enumerate(self.dirty_rects):
+            if dirty.colliderect(rect):
+                del self.dirty_rects[i]
+                self.invalidate(dirty.union(rect))
+                return
+        self.dirty_rects.append(rect)
+
+    def set_layer(self, name, surface, pos=(0, 0), alpha=None, rect=None):
+        """
+        Update a layer. Nothing is marked dirty if the layer is unchanged.
+
+        Args:
+            name: one of LAYER_ORDER
+            surface: pygame surface to show, or None to clear the layer
+            pos: (x, y) position of the surface on screen
+            alpha: surface alpha (0-255) to blit with, or None for the surface's own
+            rect: screen area actually covered by the surface, defaults to the whole surface at pos
+        """
+        layer = self.layers[name]
+        if surface is not None and rect is None:
+            rect = surface.get_rect(topleft=pos)
+        if surface is None:
+            rect = None
+        elif rect is not None:
+            rect = pygame.Rect(rect)
+
+        if surface is layer.surface and pos == layer.pos and alpha == layer.alpha and rect == layer.rect:
+            return
+
+        if layer.rect is not None:
+            self.invalidate(layer.rect)
+        if rect is not None:
+            self.invalidate(rect)
+
+        layer.surface = surface
+        layer.pos = pos
+        layer.alpha = alpha
+        layer.rect = rect
+
+    def compose(self):
+        """
+        Repaint the dirty rectangles from all layers.
+
+        Returns:
+            list of pygame.Rect that changed, suitable for pygame.display.update()
+        """
+        if not self.dirty_rects:
+            return []
+
+        dirty_rects = self.dirty_rects
+        self.dirty_rects = []
+        logging.debug("Compositing %d dirty rectangles", len(dirty_rects))
+
+        for rect in dirty_rects:
+            self.screen.set_clip(rect)
+            self.screen.fill(self.background_color, rect)
+            for name in self.LAYER_ORDER:
+                layer = self.layers[name]
+                if layer.surface is None or not layer.rect.colliderect(rect):
+                    continue
+                if layer.alpha is None:
+                    self.screen.blit(layer.surface, layer.pos)
+                else:
+                    previous_alpha = layer.surface.get_alpha()
+                    layer.surface.set_alpha(layer.alpha)
+                    self.screen.blit(layer.surface, layer.pos)
+                    layer.surface.set_alpha(previous_alpha)
+        self.screen.set_clip(None)
+
+        return dirty_rects
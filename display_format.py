@@ -0,0 +1,60 @@
+import pygame
+import logging
+
+# normal: surfaces in the display's pixel format; low: at most 16 bits per pixel (RGB565)
+MEMORY_PROFILES = ('normal', 'low')
+# Transparent color of low-memory text layers: a dark blue that is still distinct from black in RGB565
+TEXT_COLORKEY = (0, 0, 8)
+
+def surface_bytes(surface):
+    """Pixel memory used by a surface."""
+    return surface.get_pitch() * surface.get_height()
+
+def full_color_bytes(surface):
+    """Pixel memory the surface would use at 32 bits per pixel."""
+    return surface.get_width() * surface.get_height() * 4
+
+def low_memory_depth(screen):
+    """Bits per pixel of low-memory surfaces: the screen's own if it is 16 or less, else 16 (RGB565)."""
+    return min(screen.get_bitsize(), 16)
+
+def convert_photo(photo, screen, memory_profile='normal'):
+    """
+    Convert an opaque photo to the pixel format it is kept in.
+
+    In the normal profile that is the screen's format, so blitting it
+    (with or without a surface alpha) needs no per-pixel conversion. In
+    the low profile it is 16-bit RGB565 unless the screen is already 16
+    bits or less, halving the memory of every photo held on a 32-bit
+    screen at the cost of a conversion when it is blitted.
+    """
+    try:
+        if memory_profile == 'low' and screen.get_bitsize() > 16:
+            return photo.convert(16)
+        return photo.convert(screen)
+    except pygame.error as e:
+        logging.debug(f"Keeping photo in its own pixel format: {e}")
+        return photo
+
+def convert_text_layer(text_layer, screen, memory_profile='normal'):
+    """
+    Convert a per-pixel alpha text layer to the format it is kept in.
+
+    In the normal profile the layer keeps its alpha channel in the
+    display's format. In the low profile it is flattened onto
+    TEXT_COLORKEY at 16 bits per pixel and made transparent with a run
+    length encoded colorkey. Only the antialiasing of the outer edge of
+    the black border is lost.
+    """
+    try:
+        if memory_profile != 'low':
+            return text_layer.convert_alpha()
+        keyed = pygame.Surface(text_layer.get_size(), 0, low_memory_depth(screen))
+        keyed.fill(TEXT_COLORKEY)
+        keyed.blit(text_layer, (0, 0))
+        keyed.set_colorkey(TEXT_COLORKEY, pygame.RLEACCEL)
+        logging.debug("Low-memory text layer: %d bytes instead of %d", surface_bytes(keyed), surface_bytes(text_layer))
+        return keyed
+    except pygame.error as e:
+        logging.debug(f"Keeping text layer in its own pixel format: {e}")
+        return text_layer
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import bisect
+import tempfile
+import contextlib
+import threading
+import collections
+import logging
+
+# Histogram bucket upper bounds in seconds, from 0.1 ms to 10 s
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUANTILES = (0.5, 0.95, 0.99)
+PREFIX = 'hiragana_watch'
+
+# Returned by stage() while metrics are disabled, so timing a stage costs one method call
+NULL_STAGE = contextlib.nullcontext()
+
+class StageHistogram:
+    def __init__(self, window):
+        """
+        Duration statistics for one stage.
+
+        Bucket counts, sum and count accumulate since startup, as
+        Prometheus histograms expect. The most recent `window` samples are
+        also kept for rolling quantiles.
+        """
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def quantiles(self):
+        if not self.recent:
+            return {}
+        samples = sorted(self.recent)
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in QUANTILES}
+
+class StageTimer:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class FrameMetrics:
+    def __init__(self):
+        """
+        Per-stage timing of the main loop and of photo loads.
+
+        Disabled until configure() is called. Stages are timed with
+
+            with metrics.stage('events'):
+                ...
+
+        and the histograms are written every `interval` seconds to a
+        Prometheus textfile (for node_exporter's textfile collector) or a
+        JSON file by write_if_due().
+        """
+        self.enabled = False
+        self.output_file = None
+        self.output_format = 'prometheus'
+        self.interval = 60
+        self.window = 1000
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.last_write = 0
+
+    def configure(self, enabled, output_file=None, output_format='prometheus', interval=60, window=1000):
+        """
+        Args:
+            enabled: False makes stage() a no-op
+            output_file: file rewritten with the current metrics, or None to only keep them in memory
+            output_format: 'prometheus' or 'json'
+            interval: seconds between writes
+            window: number of recent samples per stage used for the rolling quantiles
+        """
+        self.enabled = enabled
+        self.output_file = output_file
+        self.output_format = output_format
+        self.interval = interval
+        self.window = window
+        self.last_write = time.time()
+        if enabled:
+            logging.info(f"Frame metrics enabled, writing {output_format} to {output_file} every {interval} seconds")
+
+    def stage(self, name):
+        """Return a context manager timing one stage."""
+        if not self.enabled:
+            return NULL_STAGE
+        return StageTimer(self, name)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = StageHistogram(self.window)
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        """
+        Get the current statistics.
+
+        Returns:
+            dict: stage name -> count, sum, buckets (upper bound -> cumulative count) and quantiles
+        """
+        with self.lock:
+            result = {}
+            for name, histogram in self.stages.items():
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(BUCKETS, histogram.bucket_counts):
+                    cumulative += count
+                    buckets[bound] = cumulative
+                result[name] = {'count': histogram.count, 'sum': histogram.sum,
+                                'buckets': buckets, 'quantiles': histogram.quantiles()}
+            return result
+
+    def format_prometheus(self, snapshot):
+        lines = [f"# HELP {PREFIX}_stage_duration_seconds Time spent in each stage of a frame or photo load.",
+                 f"# TYPE {PREFIX}_stage_duration_seconds histogram"]
+        for name, stats in sorted(snapshot.items()):
+            for bound, count in stats['buckets'].items():
+                lines.append(f'{PREFIX}_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'{PREFIX}_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'{PREFIX}_stage_duration_seconds_sum{{stage="{name}"}} {stats["sum"]:.6f}')
+            lines.append(f'{PREFIX}_stage_duration_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines.append(f"# HELP {PREFIX}_stage_recent_seconds Quantiles of the most recent samples of each stage.")
+        lines.append(f"# TYPE {PREFIX}_stage_recent_seconds gauge")
+        for name, stats in sorted(snapshot.items()):
+            for quantile, value in stats['quantiles'].items():
+                lines.append(f'{PREFIX}_stage_recent_seconds{{stage="{name}",quantile="{quantile}"}} {value:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def format_json(self, snapshot):
+        return json.dumps({'time': time.time(), 'stages': snapshot}, indent=2)
+
+    def write_if_due(self):
+        """Write the metrics file if the interval has elapsed."""
+        if not self.enabled or not self.output_file:
+            return
+        now = time.time()
+        if now - self.last_write < self.interval:
+            return
+        self.last_write = now
+        self.write()
+
+    def flush(self):
+        """Write the metrics file now, so the last partial interval is not lost at shutdown."""
+        if not self.enabled or not self.output_file:
+            return
+        self.last_write = time.time()
+        self.write()
+
+    def write(self):
+        snapshot = self.snapshot()
+        if self.output_format == 'json':
+            content = self.format_json(snapshot)
+        else:
+            content = self.format_prometheus(snapshot)
+
+        # node_exporter may read the file at any moment, so replace it atomically
+        directory = os.path.dirname(os.path.abspath(self.output_file))
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.metrics', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(content)
+                os.chmod(temp_path, 0o644)
+                os.replace(temp_path, self.output_file)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logging.error(f"Error writing frame metrics to {self.output_file}: {e}")
+
+# Shared by the main loop, the text renderer and the slideshow
+metrics = FrameMetrics()
@@ -0,0 +1,114 @@
+import os
+import mmap
+import pygame
+import logging
+
+# Bits per pixel and RGB masks of the supported framebuffer pixel formats
+PIXEL_FORMATS = {
+    'rgb565': (16, (0xF800, 0x07E0, 0x001F, 0)),
+    'xrgb8888': (32, (0x00FF0000, 0x0000FF00, 0x000000FF, 0)),
+}
+
+class FramebufferDisplay:
+    def __init__(self, path='/dev/fb0', width=800, height=480, pixel_format='auto'):
+        """
+        Output backend writing composed frames into a memory-mapped framebuffer.
+
+        Only the dirty rectangles of each frame are converted to the
+        framebuffer's pixel format and copied, row by row, into the
+        mapping. path can be any file (it is created or extended to the
+        frame size), so the backend can be tested without a framebuffer.
+
+        For a /dev/fbN device the pixel format, visible size and line
+        stride are read from /sys/class/graphics/fbN when available.
+
+        Args:
+            path: framebuffer device or file
+            width: width of the composed frames
+            height: height of the composed frames
+            pixel_format: 'rgb565', 'xrgb8888' or 'auto' (detect, else xrgb8888)
+        """
+        self.path = path
+        info = self.read_sysfs_info(path)
+        if pixel_format == 'auto':
+            pixel_format = 'rgb565' if info.get('bits_per_pixel') == 16 else 'xrgb8888'
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported framebuffer pixel format: {pixel_format}")
+        self.pixel_format = pixel_format
+        bits_per_pixel, masks = PIXEL_FORMATS[pixel_format]
+        self.bytes_per_pixel = bits_per_pixel // 8
+
+        # Frames larger than the framebuffer are clipped to it
+        fb_width, fb_height = info.get('virtual_size', (width, height))
+        if (fb_width, fb_height) != (width, height):
+            logging.warning(f"Framebuffer is {fb_width}x{fb_height}, frames are {width}x{height}; clipping")
+        self.width = min(width, fb_width)
+        self.height = min(height, fb_height)
+        self.stride = info.get('stride', fb_width * self.bytes_per_pixel)
+
+        size = self.stride * fb_height
+        self.file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        if not path.startswith('/dev/') and os.fstat(self.file.fileno()).st_size < size:
+            self.file.truncate(size)
+        self.mapped = mmap.mmap(self.file.fileno(), size, mmap.MAP_SHARED, mmap.PROT_WRITE | mmap.PROT_READ)
+
+        # Frames are converted to the framebuffer's format here; allocated once
+        self.shadow = pygame.Surface((self.width, self.height), 0, bits_per_pixel, masks)
+        self.frame_rect = self.shadow.get_rect()
+        logging.info(f"Framebuffer output on {path}: {self.width}x{self.height} {pixel_format}, stride {self.stride}")
+
+    @staticmethod
+    def read_sysfs_info(path):
+        """Read bits_per_pixel, virtual_size and stride of /dev/fbN from sysfs, if present."""
+        info = {}
+        sysfs = os.path.join('/sys/class/graphics', os.path.basename(path))
+        if not path.startswith('/dev/fb') or not os.path.isdir(sysfs):
+            return info
+        try:
+            with open(os.path.join(sysfs, 'bits_per_pixel')) as f:
+                info['bits_per_pixel'] = int(f.read())
+            with open(os.path.join(sysfs, 'virtual_size')) as f:
+                info['virtual_size'] = tuple(int(v) for v in f.read().split(','))
+            with open(os.path.join(sysfs, 'stride')) as f:
+                info['stride'] = int(f.read())
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read framebuffer information from {sysfs}: {e}")
+        return info
+
+    def update(self, surface, rects=None):
+        """
+        Copy areas of a composed frame to the framebuffer.
+
+        Args:
+            surface: the composed frame (may be self.shadow itself, composed in the framebuffer's format)
+            rects: list of pygame.Rect that changed, or None for the whole frame
+        """
+        if rects is None:
+            rects = [self.frame_rect]
+        rects = [pygame.Rect(rect).clip(self.frame_rect) for rect in rects]
+        rects = [rect for rect in rects if rect.width and rect.height]
+        if not rects:
+            return
+
+        if surface is not self.shadow:
+            for rect in rects:
+                self.shadow.blit(surface, rect, rect)
+
+        pitch = self.shadow.get_pitch()
+        # Holding the buffer locks the shadow surface, so take it after the blits
+        pixels = memoryview(self.shadow.get_buffer())
+        try:
+            for rect in rects:
+                row_bytes = rect.width * self.bytes_per_pixel
+                source = rect.y * pitch + rect.x * self.bytes_per_pixel
+                target = rect.y * self.stride + rect.x * self.bytes_per_pixel
+                for _ in range(rect.height):
+                    self.mapped[target:target + row_bytes] = pixels[source:source + row_bytes]
+                    source += pitch
+                    target += self.stride
+        finally:
+            pixels.release()
+
+    def close(self):
+        self.mapped.close()
+        self.file.close()
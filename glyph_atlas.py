@@ -0,0 +1,147 @@
+import pygame
+import logging
+import unicodedata
+from text_layout import get_font
+from outline import outline, soft_shadow
+
+# Number of atlases kept alive at once (one per font size / border / color combination)
+MAX_ATLASES = 8
+# Number of composed lines kept per atlas (the text only changes once a minute)
+MAX_LINES = 32
+
+_atlases = {}
+
+class GlyphAtlas:
+    def __init__(self, font, text_color, border_color, border_width, shadow=None):
+        """
+        Cache of bordered glyphs rasterized once and reused by blitting.
+
+        Args:
+            font: pygame font object
+            text_color: RGB tuple for the main text color
+            border_color: RGB tuple for the border color
+            border_width: width of the border in pixels
+            shadow: optional outline.Shadow drawn behind the border; it extends
+                    the glyph and line surfaces to the right and bottom only, so
+                    their top-left corner stays where the text is placed
+        """
+        self.font = font
+        self.text_color = text_color
+        self.border_color = border_color
+        self.border_width = border_width
+        self.shadow = shadow
+        # char -> (border_surface, text_surface, bordered_surface, shadow_surface or None)
+        self.glyphs = {}
+        # text -> composed line surface
+        self.lines = {}
+
+    def get_glyph(self, char):
+        """Return the cached cells for a character, rasterizing it on first use."""
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            glyph = self.rasterize_glyph(char)
+            self.glyphs[char] = glyph
+        return glyph
+
+    def rasterize_glyph(self, text):
+        border_width = self.border_width
+        text_surface = self.font.render(text, True, self.text_color)
+
+        # Outline only, so lines can draw every border before any glyph body
+        border_surface = outline(self.font.render(text, True, self.border_color), border_width)
+
+        # Same result as render_text_with_border() for the same text
+        shadow_surface = None
+        if self.shadow is not None:
+            shadow_surface = soft_shadow(border_surface, self.shadow)
+            bordered_surface = shadow_surface.copy()
+            bordered_surface.blit(border_surface, (0, 0))
+        else:
+            bordered_surface = border_surface.copy()
+        bordered_surface.blit(text_surface, (border_width, border_width))
+
+        return border_surface, text_surface, bordered_surface, shadow_surface
+
+    def render_glyph(self, char):
+        """Return the bordered surface for a single character."""
+        return self.get_glyph(char)[2]
+
+    def glyph_size(self, char):
+        """Return (width, height) of the bordered surface for a single character, without its shadow."""
+        return self.get_glyph(char)[0].get_size()
+
+    def line_size(self, text):
+        """Return (width, height) of a bordered line, without its shadow."""
+        width, height = self.font.size(text)
+        return width + self.border_width * 2, height + self.border_width * 2
+
+    def render_line(self, text):
+        """
+        Compose a bordered line of text from atlas cells.
+
+        All shadows are drawn first, then all borders and the glyph bodies
+        on top, like render_text_with_border() does for a whole string.
+        Cells are placed at the offsets the font gives each prefix of the
+        line, which matches a whole-string render for full-width characters
+        with a fixed advance, such as kana. Lines with any other character
+        (proportional, kerned or with fractional advances) are rendered in
+        one piece instead.
+
+        Args:
+            text: string to render
+
+        Returns:
+            pygame surface with bordered text
+        """
+        line_surface = self.lines.get(text)
+        if line_surface is None:
+            if len(self.lines) >= MAX_LINES:
+                self.lines.clear()
+            line_surface = self.compose_line(text)
+            self.lines[text] = line_surface
+        return line_surface
+
+    def compose_line(self, text):
+        if not all(unicodedata.east_asian_width(char) in ('W', 'F') for char in text):
+            return self.rasterize_glyph(text)[2]
+
+        border_width = self.border_width
+        glyphs = [self.get_glyph(char) for char in text]
+        # Place glyphs where the font would put them in the whole string
+        offsets = [self.font.size(text[:i])[0] for i in range(len(text))]
+        width, height = self.line_size(text)
+        if self.shadow is not None:
+            width += self.shadow.offset + self.shadow.blur
+            height += self.shadow.offset + self.shadow.blur
+
+        line_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+
+        for (_, _, _, shadow_surface), x in zip(glyphs, offsets):
+            if shadow_surface is not None:
+                line_surface.blit(shadow_surface, (x, 0))
+
+        for (border_surface, _, _, _), x in zip(glyphs, offsets):
+            line_surface.blit(border_surface, (x, 0))
+
+        for (_, text_surface, _, _), x in zip(glyphs, offsets):
+            line_surface.blit(text_surface, (x + border_width, border_width))
+
+        return line_surface
+
+def get_glyph_atlas(font_path, font_size, text_color, border_color, border_width, shadow=None):
+    """
+    Get the shared atlas for a font file, size, colors, border width and shadow.
+
+    The font object comes from the shared font cache, so callers do not
+    need to construct a new pygame font every frame.
+    """
+    key = (font_path, font_size, text_color, border_color, border_width, shadow)
+    atlas = _atlases.get(key)
+    if atlas is None:
+        if len(_atlases) >= MAX_ATLASES:
+            # Drop the oldest atlas
+            del _atlases[next(iter(_atlases))]
+        logging.debug(f"Creating glyph atlas for size {font_size}, border {border_width}")
+        atlas = GlyphAtlas(get_font(font_path, font_size), text_color, border_color, border_width, shadow)
+        _atlases[key] = atlas
+    return atlas
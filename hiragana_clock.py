@@ -0,0 +1,241 @@
+#!/usr/bin/python
+
+import locale
+import datetime
+import functools
+
+# Number readings, built once at import time instead of on every call
+JAPANESE_NUMBERS = [
+    "", "いち", "に", "さん", "よん", "ご", "ろく", "なな", "はち", "きゅう"
+]
+
+MINUTE_EXCEPTIONS = {
+    1: "いっぷん", 2: "にふん", 3: "さんぷん", 4: "よんぷん", 5: "ごふん",
+    6: "ろっぷん", 7: "ななふん", 8: "はっぷん", 9: "きゅうふん", 10: "じゅっぷん",
+    11: "じゅういっぷん", 12: "じゅうにふん", 13: "じゅうさんぷん", 14: "じゅうよんぷん", 15: "じゅうごふん",
+    16: "じゅうろっぷん", 17: "じゅうななふん", 18: "じゅうはっぷん", 19: "じゅうきゅうふん", 20: "にじゅっぷん",
+    21: "にじゅういっぷん", 22: "にじゅうにふん", 23: "にじゅうさんぷん", 24: "にじゅうよんぷん", 25: "にじゅごふん",
+    26: "にじゅうろっぷん", 27: "にじゅうななふん", 28: "にじゅうはっぷん", 29: "にじゅうきゅうふん", 30: "はん",
+    31: "さんじゅういっぷん", 32: "さんじゅうにふん", 33: "さんじゅうさんぷん", 34: "さんじゅうよんぷん", 35: "さんじゅうごふん",
+    36: "さんじゅうろっぷん", 37: "さんじゅうななふん", 38: "さんじゅうはっぷん", 39: "さんじゅうきゅうふん", 40: "よんじゅっぷん",
+    41: "よんじゅういっぷん", 42: "よんじゅうにふん", 43: "よんじゅうさんぷん", 44: "よんじゅうよんぷん", 45: "よんじゅうごふん",
+    46: "よんじゅうろっぷん", 47: "よんじゅうななふん", 48: "よんじゅうはっぷん", 49: "よんじゅうきゅうふん", 50: "ごじゅっぷん",
+    51: "ごじゅういっぷん", 52: "ごじゅうにふん", 53: "ごじゅうさんぷん", 54: "ごじゅうよんぷん", 55: "ごじゅうごふん",
+    56: "ごじゅうろっぷん", 57: "ごじゅうななふん", 58: "ごじゅうはっぷん", 59: "ごじゅうきゅうふん"
+}
+
+DAY_EXCEPTIONS = {
+    1: "ついたち", 2: "ふつか", 3: "みっか", 4: "よっか", 5: "いつか", 6: "むいか", 7: "なのか",
+    8: "ようか", 9: "ここのか", 10: "とおか", 11: "じゅういちにち", 12: "じゅうににち", 13: "じゅうさんにち",
+    14: "じゅうよっか", 15: "じゅうごにち", 16: "じゅうろくにち", 17: "じゅうしちにち", 18: "じゅうはちにち",
+    19: "じゅうくにち", 20: "はつか", 21: "にじゅういちにち", 22: "にじゅうににち", 23: "にじゅうさんにち",
+    24: "にじゅうよっか", 25: "にじゅうごにち", 26: "にじゅうろくにち", 27: "にじゅうしちにち",
+    28: "にじゅうはちにち", 29: "にじゅうくにち", 30: "さんじゅうにち", 31: "さんじゅういちにち"
+}
+
+HOUR_EXCEPTIONS = {
+    0: "じゅうにじ", 1: "いちじ", 2: "にじ", 3: "さんじ", 4: "よじ", 5: "ごじ", 6: "ろくじ", 7: "しちじ", 8: "はちじ",
+    9: "くじ", 10: "じゅうじ", 11: "じゅういちじ", 12: "じゅうにじ"
+}
+
+# Indexed by datetime.weekday() (Monday is 0), so no locale is needed
+WEEKDAY_PHRASES = (
+    "げつようび", "かようび", "すいようび", "もくようび", "きんようび", "どようび", "にちようび"
+)
+
+def get_japanese_number(number, category):
+    if category == "minute":
+        if number in MINUTE_EXCEPTIONS:
+            return MINUTE_EXCEPTIONS[number]
+        elif number < 10:
+            return get_japanese_number(number, "default") + "ふん"
+        else:
+            return get_japanese_number(number // 10, "default") + "じゅう" + get_japanese_number(number % 10, "default") + "ふん"
+    elif category == "day":
+        return DAY_EXCEPTIONS[number]
+    elif category == "hour":
+        return HOUR_EXCEPTIONS[number]
+    elif category == "year":
+        digits = [int(d) for d in str(number)]
+        year_hiragana = ""
+        if number >= 1000:
+            thousand_digit = digits[-4]
+            year_hiragana += get_japanese_number(thousand_digit, "default") + "せん"
+            number %= 1000
+        if number >= 100:
+            hundred_digit = digits[-3]
+            year_hiragana += get_japanese_number(hundred_digit, "default") + "ひゃく"
+            number %= 100
+        if number >= 10:
+            ten_digit = digits[-2]
+            year_hiragana += get_japanese_number(ten_digit, "default") + "じゅう"
+            number %= 10
+        if number > 0:
+            year_hiragana += get_japanese_number(number, "default")
+        year_hiragana += "ねん"
+        return year_hiragana
+    else:
+        if number < 10:
+            return JAPANESE_NUMBERS[number]
+        elif number < 20:
+            return "じゅう" + JAPANESE_NUMBERS[number % 10]
+        else:
+            return JAPANESE_NUMBERS[number // 10] + "じゅう" + JAPANESE_NUMBERS[number % 10]
+
+def build_time_phrase(hour, minute):
+    """
+    Build the spoken time sentence for a 24-hour hour and a minute.
+
+    Args:
+        hour: hour of the day (0-23)
+        minute: minute of the hour (0-59)
+
+    Returns:
+        str: e.g. "いまはごごさんじじゅっぷんです。"
+    """
+    is_pm = hour >= 12
+    hour = hour % 12
+    if hour == 0:
+        hour = 12
+
+    if hour == 12 and minute == 0:
+        if is_pm:
+            return "いまはごごじゅうにじです。"
+        else:
+            return "いまはごぜんれいじです。"
+
+    hour_text = get_japanese_number(hour, "hour")
+    am_pm = "ごご" if is_pm else "ごぜん"
+    if minute == 0:
+        return f"いまは{am_pm}{hour_text}です。"
+    minute_text = get_japanese_number(minute, "minute")
+    return f"いまは{am_pm}{hour_text}{minute_text}です。"
+
+# Precomputed phrase tables
+TIME_PHRASES = tuple(build_time_phrase(hour, minute) for hour in range(24) for minute in range(60))
+MONTH_PHRASES = ("",) + tuple(get_japanese_number(month, "default") + "がつ" for month in range(1, 13))
+DAY_PHRASES = ("",) + tuple(get_japanese_number(day, "day") for day in range(1, 32))
+
+@functools.lru_cache(maxsize=16)
+def year_phrase(year):
+    """Return the reading of a year, e.g. "にせんにじゅうろくねん"."""
+    return get_japanese_number(year, "year")
+
+@functools.lru_cache(maxsize=16)
+def _date_phrase(year, month, day, weekday):
+    return f"きょうは{year_phrase(year)}{MONTH_PHRASES[month]}{DAY_PHRASES[day]}{WEEKDAY_PHRASES[weekday]}です。"
+
+def date_phrase(now):
+    """
+    Get the date sentence for a datetime.
+
+    Args:
+        now: datetime.datetime or datetime.date
+
+    Returns:
+        str: e.g. "きょうはにせんにじゅうろくねんじゅうがつじゅうしちにちどようびです。"
+    """
+    return _date_phrase(now.year, now.month, now.day, now.weekday())
+
+def time_phrase(now):
+    """Get the time sentence for a datetime from the precomputed table."""
+    return TIME_PHRASES[now.hour * 60 + now.minute]
+
+def clock_phrase(now):
+    """Get the full text shown on the clock (date sentence followed by time sentence)."""
+    return date_phrase(now) + time_phrase(now)
+
+def _legacy_clock_phrase(now):
+    # The per-frame formatting main() used before the tables existed, kept to validate them
+    year = get_japanese_number(now.year, "year")
+    month = get_japanese_number(now.month, "default") + "がつ"
+    day = get_japanese_number(now.day, "day")
+    weekday_mapping = {
+        "Sun": "にちようび",
+        "Mon": "げつようび",
+        "Tue": "かようび",
+        "Wed": "すいようび",
+        "Thu": "もくようび",
+        "Fri": "きんようび",
+        "Sat": "どようび"
+    }
+    # The English weekday abbreviation, read under the C locale as main() used to (with en_US)
+    previous = locale.setlocale(locale.LC_TIME)
+    try:
+        locale.setlocale(locale.LC_TIME, 'C')
+        weekday_text = weekday_mapping[now.strftime("%a")]
+    finally:
+        locale.setlocale(locale.LC_TIME, previous)
+    date_text = f"きょうは{year}{month}{day}{weekday_text}です。"
+
+    hour = now.hour
+    is_pm = hour >= 12
+    hour = hour % 12
+    if hour == 0:
+        hour = 12
+
+    if hour == 12 and now.minute == 0:
+        if is_pm:
+            time_text = "いまはごごじゅうにじです。"
+        else:
+            time_text = "いまはごぜんれいじです。"
+    else:
+        hour_text = get_japanese_number(hour, "hour")
+        am_pm = "ごご" if is_pm else "ごぜん"
+        if now.minute == 0:
+            time_text = f"いまは{am_pm}{hour_text}です。"
+        else:
+            minute = get_japanese_number(now.minute, "minute")
+            time_text = f"いまは{am_pm}{hour_text}{minute}です。"
+
+    return date_text + time_text
+
+def _check(actual, expected, label):
+    # Not an assert, so the check still runs under python -O
+    if actual != expected:
+        raise ValueError(f"Phrase mismatch for {label}: {actual!r} != {expected!r}")
+
+def validate():
+    """
+    Check the tables against the legacy formatting for every minute of a
+    day and every day of a leap year.
+
+    Returns:
+        int: number of datetimes checked
+
+    Raises:
+        ValueError: a phrase differs from the legacy formatting
+    """
+    checked = 0
+    start = datetime.datetime(2024, 1, 1)
+    for minute in range(24 * 60):
+        now = start + datetime.timedelta(minutes=minute)
+        _check(clock_phrase(now), _legacy_clock_phrase(now), now)
+        checked += 1
+    for day in range(366):
+        now = start + datetime.timedelta(days=day, hours=13, minutes=30)
+        _check(clock_phrase(now), _legacy_clock_phrase(now), now)
+        checked += 1
+
+    # Midnight and noon are read differently from every other hour
+    _check(time_phrase(datetime.datetime(2024, 1, 1, 0, 0)), "いまはごぜんれいじです。", "midnight")
+    _check(time_phrase(datetime.datetime(2024, 1, 1, 12, 0)), "いまはごごじゅうにじです。", "noon")
+    _check(time_phrase(datetime.datetime(2024, 1, 1, 0, 1)), "いまはごぜんじゅうにじいっぷんです。", "00:01")
+    _check(time_phrase(datetime.datetime(2024, 1, 1, 12, 30)), "いまはごごじゅうにじはんです。", "12:30")
+    return checked
+
+def benchmark(iterations=100000):
+    """Time the table lookups against the legacy per-frame formatting."""
+    import timeit
+
+    now = datetime.datetime(2026, 10, 17, 16, 45)
+
+    # The legacy formatting includes the locale switch main() made twice per frame to read the weekday
+    for name, func in (("legacy (with locale switch)", lambda: _legacy_clock_phrase(now)),
+                       ("clock_phrase", lambda: clock_phrase(now))):
+        seconds = timeit.timeit(func, number=iterations)
+        print(f"{name:30s} {seconds / iterations * 1000000:8.2f} us/call")
+
+if __name__ == "__main__":
+    print(f"Validated {validate()} phrases against the legacy formatting")
+    benchmark()
@@ -0,0 +1,532 @@
+import os
+import json
+import time
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+import http.client
+import html.parser
+import urllib.parse
+import concurrent.futures
+from photo_source import PhotoSource
+
+# File in the cache directory remembering the validators of the manifest and of every cached photo
+STATE_FILE = '.photo_source.json'
+# Seconds between saves of the state while photos are downloading
+STATE_SAVE_INTERVAL = 60
+# Errors meaning the photo service could not be reached or misbehaved
+FETCH_ERRORS = (OSError, http.client.HTTPException)
+
+class ConnectionPool:
+    def __init__(self, url, timeout=10):
+        """
+        Keep-alive HTTP(S) connections to one server, reused across requests and threads.
+
+        A connection is taken from the pool for each request and returned
+        once its response has been read, unless the server is closing it.
+        A request on a reused connection that the server has meanwhile
+        closed is retried once on a new connection.
+
+        Args:
+            url: any URL on the server (only scheme, host and port are used)
+            timeout: socket timeout in seconds
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported photo service URL: {url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        # Most recently used connections first, as they are the least likely to have timed out
+        self.idle = queue.LifoQueue()
+        self.connections_opened = 0
+
+    def new_connection(self):
+        self.connections_opened += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def get(self, path, headers=None, destination=None):
+        """
+        Send a GET request.
+
+        Args:
+            path: request path, including the query string
+            headers: extra request headers
+            destination: file object receiving the body of a 200 response, or None to return it
+
+        Returns:
+            tuple: (status, response headers, body bytes or None if it went to destination)
+        """
+        for attempt in range(2):
+            try:
+                connection = self.idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                connection = self.new_connection()
+                reused = False
+            try:
+                connection.request('GET', path, headers=headers or {})
+                response = connection.getresponse()
+            except FETCH_ERRORS:
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            try:
+                if destination is not None and response.status == 200:
+                    shutil.copyfileobj(response, destination)
+                    body = None
+                else:
+                    body = response.read()
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.idle.put(connection)
+            return response.status, response.headers, body
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class CancellableFile:
+    """Wraps a file so writes fail once cancelled is set, abandoning a download midway."""
+    def __init__(self, f, cancelled):
+        self.f = f
+        self.cancelled = cancelled
+
+    def write(self, data):
+        if self.cancelled.is_set():
+            raise OSError("download cancelled")
+        return self.f.write(data)
+
+class LinkParser(html.parser.HTMLParser):
+    """Collects the href of every link in an HTML page (e.g. a directory listing)."""
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+def conditional_headers(validators):
+    """Request headers revalidating a cached response from its ETag and Last-Modified."""
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def response_validators(headers):
+    return {'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+
+class HttpPhotoSource(PhotoSource):
+    def __init__(self, manifest_url, cache_directory, extensions, max_connections=4, timeout=10,
+                 revalidate_interval=24 * 3600):
+        """
+        Photos served over HTTP, mirrored into a local cache directory.
+
+        manifest_url returns the list of photos, either as a JSON list of
+        URLs or as an HTML page linking to them (such as the directory
+        listing of a plain web server, whose links to subdirectories are
+        followed). Photos must be on the same server, below the manifest's
+        directory. They are mirrored into cache_directory under the same
+        relative paths, so favorite folders work as they do for a local
+        directory.
+
+        Each refresh requests the manifest and the listings below it
+        conditionally (If-None-Match / If-Modified-Since), and downloads
+        the photos that are new or missing from the cache. Cached photos
+        are revalidated the same way once every revalidate_interval, so an
+        edited photo is fetched again without every refresh costing one
+        request per photo. Photos are downloaded
+        in the background by at most max_connections threads sharing a
+        pool of keep-alive connections: refresh() only starts them, and
+        returns the photos finished since the previous call, while
+        has_changes() asks for another refresh as soon as some are. While
+        the service is unreachable the cached photos keep being shown.
+
+        Args:
+            manifest_url: URL of the photo list
+            cache_directory: directory holding the downloaded photos
+            extensions: lowercase file extensions of photos
+            max_connections: number of concurrent downloads (and connections)
+            timeout: socket timeout in seconds
+            revalidate_interval: seconds between checks that a cached photo is unchanged
+        """
+        self.manifest_url = manifest_url
+        self.root = os.path.abspath(cache_directory)
+        self.description = manifest_url
+        self.extensions = tuple(extensions)
+        self.max_connections = max_connections
+        self.revalidate_interval = revalidate_interval
+        self.pool = ConnectionPool(manifest_url, timeout)
+        manifest_parts = urllib.parse.urlsplit(manifest_url)
+        self.manifest_path = urllib.parse.urlunsplit(('', '', manifest_parts.path or '/', manifest_parts.query, ''))
+        # Photo URLs are resolved against the manifest and must be below its directory
+        self.base_path = (manifest_parts.path or '/').rsplit('/', 1)[0] + '/'
+
+        try:
+            os.makedirs(self.root, exist_ok=True)
+        except OSError as e:
+            logging.error(f"Failed to create photo cache directory: {e}")
+        self.state_path = os.path.join(self.root, STATE_FILE)
+        # Read on first use (see load), as it checks every cached photo
+        self.state = None
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_connections)
+        # Photos being downloaded, and (relative path, result, validators) of the finished downloads
+        # not yet reported by refresh(); the state is only changed by refresh(), not by the downloads
+        self.downloading = set()
+        self.finished = []
+        self.finished_lock = threading.Lock()
+        self.closing = threading.Event()
+        self.last_save = 0
+
+    def load(self):
+        """Read the cache state, the first time it is needed: normally on the first scan_photos() call."""
+        if self.state is None:
+            self.state = self.load_state()
+
+    def load_state(self):
+        # listings: request path of the manifest and of each listing below it -> its validators,
+        # photos and subdirectories; photos: relative path -> validators, time checked and validation
+        state = {'listings': {}, 'entries': [], 'photos': {}}
+        try:
+            with open(self.state_path) as f:
+                state.update(json.load(f))
+            # Written by versions that only kept the validators of the manifest
+            state.pop('manifest', None)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Photo cache state {self.state_path} is unreadable, revalidating everything: {e}")
+        # Forget photos whose file was deleted from the cache
+        state['photos'] = {relative: validators for relative, validators in state['photos'].items()
+                           if os.path.isfile(self.local_path(relative))}
+        return state
+
+    def save(self):
+        self.last_save = time.time()
+        try:
+            self.save_state()
+        except OSError as e:
+            logging.error(f"Error saving photo cache state {self.state_path}: {e}")
+
+    def save_state(self):
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.state', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.state, f)
+            os.replace(temp_path, self.state_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def local_path(self, relative):
+        return os.path.join(self.root, *relative.split('/'))
+
+    def request_path(self, relative):
+        return self.base_path + urllib.parse.quote(relative)
+
+    def relative_path(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def paths(self):
+        self.load()
+        return [self.local_path(relative) for relative in self.state['photos']]
+
+    def validation_status(self, paths):
+        self.load()
+        statuses = {}
+        for path in paths:
+            status = self.state['photos'].get(self.relative_path(path), {}).get('status')
+            if status is not None:
+                statuses[path] = status == 'ok'
+        return statuses
+
+    def record_validation(self, checks):
+        self.load()
+        # Kept with the photo's validators, so a new download of the photo drops it; saved with the state
+        for check in checks:
+            entry = self.state['photos'].get(self.relative_path(check.path))
+            if entry is not None:
+                entry.update(status='ok' if check.ok else 'bad', width=check.width, height=check.height,
+                             orientation=check.orientation, error=check.error)
+
+    def modified_times(self, paths):
+        # The download time, as the mtime of the cached file would be
+        self.load()
+        times = {}
+        for path in paths:
+            downloaded = self.state['photos'].get(self.relative_path(path), {}).get('downloaded')
+            if downloaded is not None:
+                times[path] = downloaded
+        return times
+
+    def parse_manifest(self, headers, body, page_path):
+        """
+        Read a manifest response, or the listing of a subdirectory.
+
+        Args:
+            headers: response headers
+            body: response body
+            page_path: request path of the page, which relative links are resolved against
+
+        Returns:
+            tuple: (relative paths of the photos, request paths of the subdirectory listings)
+        """
+        text = body.decode(headers.get_content_charset() or 'utf-8', errors='replace')
+        if headers.get_content_type() == 'application/json' or text.lstrip().startswith('['):
+            links = json.loads(text)
+        else:
+            parser = LinkParser()
+            parser.feed(text)
+            links = parser.links
+
+        page_url = urllib.parse.urljoin(self.manifest_url, page_path)
+        photos = set()
+        directories = set()
+        for link in links:
+            parts = urllib.parse.urlsplit(urllib.parse.urljoin(page_url, str(link)))
+            if parts.hostname != self.pool.host or parts.port != self.pool.port:
+                continue
+            path = urllib.parse.unquote(parts.path)
+            if not path.startswith(self.base_path):
+                continue
+            relative = path[len(self.base_path):]
+            is_directory = relative.endswith('/')
+            if is_directory:
+                relative = relative[:-1]
+            elif not path.lower().endswith(self.extensions):
+                continue
+            segments = relative.split('/')
+            if any(segment in ('', '.', '..') or segment.startswith('.') for segment in segments):
+                continue
+            if is_directory:
+                directories.add(self.request_path(relative + '/'))
+            else:
+                photos.add(relative)
+        return sorted(photos), sorted(directories)
+
+    def list_photos(self):
+        """
+        Fetch the manifest and the listings of the subdirectories it links to,
+        each conditionally.
+
+        Returns:
+            list: relative paths of the photos, or None if the service answered with an error
+
+        Raises:
+            OSError, http.client.HTTPException: the service could not be reached
+            ValueError: a listing could not be read
+        """
+        listings = {}
+        entries = set()
+        pending = [self.manifest_path]
+        while pending:
+            path = pending.pop()
+            if path in listings:
+                continue
+            cached = self.state['listings'].get(path)
+            status, headers, body = self.pool.get(path, conditional_headers(cached['validators'] if cached else {}))
+            if status == 304 and cached is not None:
+                listing = cached
+            elif status == 200:
+                photos, directories = self.parse_manifest(headers, body, path)
+                listing = {'validators': response_validators(headers), 'photos': photos,
+                           'directories': directories}
+            else:
+                logging.warning("Photo service returned %d for %s, showing %d cached photos",
+                                status, path, len(self.state['photos']))
+                return None
+            listings[path] = listing
+            entries.update(listing['photos'])
+            pending.extend(listing['directories'])
+        self.state['listings'] = listings
+        return sorted(entries)
+
+    def download(self, relative, validators):
+        """
+        Fetch one photo into the cache, conditionally if it is cached already.
+
+        Args:
+            relative: path of the photo below the manifest's directory
+            validators: validators of the cached photo, or None if it is not cached
+
+        Returns:
+            tuple: ('added', 'updated', 'unchanged' or 'failed', validators of the downloaded photo or None)
+        """
+        path = self.local_path(relative)
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.download', suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                status, headers, _ = self.pool.get(self.request_path(relative),
+                                                   conditional_headers(validators or {}),
+                                                   CancellableFile(f, self.closing))
+            if status == 304 and validators is not None:
+                return 'unchanged', None
+            if status != 200:
+                logging.warning("Photo service returned %d for %s", status, relative)
+                return 'failed', None
+            os.replace(temp_path, path)
+            temp_path = None
+            return ('updated' if validators is not None else 'added'), response_validators(headers)
+        except FETCH_ERRORS as e:
+            if not self.closing.is_set():
+                logging.warning("Error downloading %s: %s", relative, e)
+            return 'failed', None
+        finally:
+            if temp_path is not None:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+
+    def start_download(self, relative):
+        self.downloading.add(relative)
+        future = self.executor.submit(self.download, relative, self.state['photos'].get(relative))
+
+        def finished(future):
+            try:
+                result, validators = future.result()
+            except concurrent.futures.CancelledError:
+                return
+            except Exception as e:
+                logging.error(f"Error downloading {relative}: {e}")
+                result, validators = 'failed', None
+            with self.finished_lock:
+                self.finished.append((relative, result, validators))
+            if self.notify is not None:
+                self.notify()
+
+        future.add_done_callback(finished)
+
+    def collect_downloads(self):
+        """
+        Record the downloads finished since the last call.
+
+        Returns:
+            tuple: (added, updated) lists of local photo paths, and the count of each result
+        """
+        with self.finished_lock:
+            finished, self.finished = self.finished, []
+        added = []
+        updated = []
+        counts = dict.fromkeys(('added', 'updated', 'unchanged', 'failed'), 0)
+        wanted = set(self.state['entries'])
+        for relative, result, validators in finished:
+            self.downloading.discard(relative)
+            counts[result] += 1
+            if result == 'unchanged' and relative in self.state['photos']:
+                self.state['photos'][relative]['checked'] = time.time()
+            if validators is None:
+                continue
+            path = self.local_path(relative)
+            if relative not in wanted:
+                # Dropped from the manifest while it was downloading
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logging.warning(f"Could not remove {path} from the photo cache: {e}")
+                continue
+            validators['checked'] = validators['downloaded'] = time.time()
+            self.state['photos'][relative] = validators
+            (updated if result == 'updated' else added).append(path)
+        return added, updated, counts
+
+    def has_changes(self):
+        with self.finished_lock:
+            return bool(self.finished)
+
+    def refresh(self):
+        """
+        Report the downloads finished since the last call or, when there are
+        none, check the manifest and start downloading what changed.
+
+        Returns:
+            tuple: (added, removed) lists of local photo paths; updated photos are in both
+        """
+        start_time = time.time()
+        self.load()
+        added, updated, counts = self.collect_downloads()
+        if self.downloading or any(counts.values()):
+            # The manifest is checked again by the next periodic refresh, not as soon as a round ends
+            logging.info("Photo service: %d downloaded, %d updated, %d unchanged, %d failed, %d still downloading",
+                         counts['added'], counts['updated'], counts['unchanged'], counts['failed'],
+                         len(self.downloading))
+            # Saved as photos arrive too, so a long first download is not repeated after an interruption
+            if not self.downloading or time.time() - self.last_save >= STATE_SAVE_INTERVAL:
+                self.save()
+            return added + updated, updated
+
+        removed = []
+        new = []
+        stale = []
+        entries = None
+        try:
+            entries = self.list_photos()
+        except FETCH_ERRORS as e:
+            logging.warning("Photo service %s unreachable, showing %d cached photos: %s",
+                            self.manifest_url, len(self.state['photos']), e)
+        except ValueError as e:
+            logging.error(f"Invalid photo list from {self.manifest_url}: {e}")
+
+        if entries is not None:
+            self.state['entries'] = entries
+            wanted = set(entries)
+            for relative in [relative for relative in self.state['photos'] if relative not in wanted]:
+                del self.state['photos'][relative]
+                path = self.local_path(relative)
+                removed.append(path)
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logging.warning(f"Could not remove {path} from the photo cache: {e}")
+
+            # Photos missing from the cache, plus the cached ones due for revalidation
+            checked_before = time.time() - self.revalidate_interval
+            for relative in entries:
+                cached = self.state['photos'].get(relative)
+                if cached is None:
+                    new.append(relative)
+                elif cached.get('checked', 0) < checked_before:
+                    stale.append(relative)
+            for relative in new + stale:
+                self.start_download(relative)
+
+        self.save()
+
+        if entries is not None:
+            logging.info("Photo service refreshed in %.2f seconds: %d listed, %d removed, %d to download, "
+                         "%d to revalidate (%d connections opened so far)",
+                         time.time() - start_time, len(entries), len(removed), len(new), len(stale),
+                         self.pool.connections_opened)
+        return added + updated, removed + updated
+
+    def close(self):
+        # Queued downloads are dropped and running ones abandoned; they are fetched again on the next run
+        self.closing.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+        if self.state is None:
+            # Never read, so there is nothing to save
+            return
+        self.collect_downloads()
+        self.save()
@@ -3,286 +3,242 @@
 import logging
 import pygame
 import datetime
-import locale
 import sys
 import os
 import configparser
+import argparse
 import time
 
-# Read the configuration file
+# Time-to-first-frame is measured from here
+startup_time = time.perf_counter()
+
+# Read the configuration file (once; everything below uses this parser)
 config = configparser.ConfigParser()
 config.read('config.ini')
 
+parser = argparse.ArgumentParser(description="Japanese hiragana clock and slideshow")
+parser.add_argument('--export', metavar='DIRECTORY',
+                    help="render the clock for every minute of the given days to DIRECTORY instead of showing it")
+parser.add_argument('--start-date', type=datetime.date.fromisoformat, help="first day to export, YYYY-MM-DD (default today)")
+parser.add_argument('--end-date', type=datetime.date.fromisoformat, help="last day to export (default the start date)")
+parser.add_argument('--width', type=int, help="width of exported frames (default [Display] width)")
+parser.add_argument('--height', type=int, help="height of exported frames (default [Display] height)")
+parser.add_argument('--orientation', choices=('horizontal', 'vertical'),
+                    help="text orientation of exported frames (default [Display] text_orientation)")
+parser.add_argument('--format', choices=('png', 'raw'), default='png',
+                    help="png, or raw 8-bit RGB rows (default png)")
+parser.add_argument('--jobs', type=int, help="number of rendering processes (default one per CPU core)")
+args = parser.parse_args()
+
+# Offline export: render frames to files and exit, without logging or display setup
+if args.export:
+    from offline_renderer import export_frames
+    export_font = config.get('Font', 'font_file', fallback='')
+    if not os.path.isfile(export_font):
+        print(f"Error: Font file '{export_font}' not found")
+        sys.exit(1)
+    export_frames(args.export, export_font,
+                  args.width or config.getint('Display', 'width', fallback=800),
+                  args.height or config.getint('Display', 'height', fallback=480),
+                  args.orientation or config.get('Display', 'text_orientation', fallback='horizontal'),
+                  args.format, args.start_date, args.end_date, args.jobs,
+                  config.getboolean('Font', 'shadow', fallback=False))
+    sys.exit(0)
+
 # Set up logging
+from watch_logging import setup_logging
+log_max_bytes = config.getint('Logging', 'max_size_kb', fallback=1024) * 1024
+log_backup_count = config.getint('Logging', 'backup_count', fallback=3)
+log_rate_limit = config.getint('Logging', 'rate_limit_interval', fallback=60)
 try:
     log_level = config.get('Logging', 'level', fallback='INFO')
     numeric_level = getattr(logging, log_level.upper(), None)
     if not isinstance(numeric_level, int):
         raise ValueError(f'Invalid log level: {log_level}')
-    logging.basicConfig(filename='watch.log', level=numeric_level,
-                        format='%(asctime)s - %(levelname)s - %(message)s')
+    setup_logging('watch.log', numeric_level, log_max_bytes, log_backup_count, log_rate_limit)
 except Exception as e:
     print(f"Error setting up logging: {e}")
     print("Defaulting to INFO level logging")
-    logging.basicConfig(filename='watch.log', level=logging.INFO,
-                        format='%(asctime)s - %(levelname)s - %(message)s')
+    setup_logging('watch.log', logging.INFO, log_max_bytes, log_backup_count, log_rate_limit)
 
 # KAZ - add slideshow
 from photo_manager import PhotoManager
+from photo_validator import PhotoValidator
+from photo_source import LocalPhotoSource
+from http_photo_source import HttpPhotoSource
+from photo_selector import PhotoSelector, PhotoWeights
 from slideshow import Slideshow
-
-# Set the locale to Japanese
-try:
-    locale.setlocale(locale.LC_TIME, 'ja_JP.UTF-8')
-except locale.Error:
-    print("Error: Japanese locale not found. Please install Japanese language support.")
-    sys.exit(1)
-
-# Initialize Pygame
-pygame.init()
-
-# Read the configuration file
-config = configparser.ConfigParser()
-config.read('config.ini')
+from ken_burns import parse_motion_paths
+from rendition_cache import RenditionCache
+from surface_cache import SurfaceCache
+from text_renderer import render_text_layer, BLACK
+from compositor import Compositor
+from framebuffer import FramebufferDisplay
+from display_format import convert_text_layer, MEMORY_PROFILES
+from scheduler import Scheduler
+from quality_governor import QualityGovernor, parse_tiers, describe_tier, DEFAULT_TIERS
+from hiragana_clock import clock_phrase
+from frame_metrics import metrics
 
 try:
     font_path = config.get('Font', 'font_file')
+    text_shadow = config.getboolean('Font', 'shadow', fallback=False)
     screen_width = config.getint('Display', 'width')
     screen_height = config.getint('Display', 'height')
     fullscreen = config.getboolean('Display', 'fullscreen')
     text_orientation = config.get('Display', 'text_orientation', fallback='horizontal')
+    display_output = config.get('Display', 'output', fallback='pygame')
+    framebuffer_device = config.get('Display', 'framebuffer_device', fallback='/dev/fb0')
+    framebuffer_format = config.get('Display', 'framebuffer_format', fallback='auto')
+    memory_profile = config.get('Display', 'memory_profile', fallback='normal')
     slideshow_enabled = config.getboolean('Slideshow', 'enabled', fallback=False)
     transition_time = config.getint('Slideshow', 'transition_time', fallback=60)
+    prefetch_count = config.getint('Slideshow', 'prefetch_count', fallback=2)
+    fade_duration = config.getfloat('Slideshow', 'fade_duration', fallback=1.7)
+    surface_cache_mb = config.getint('Slideshow', 'surface_cache_mb', fallback=64)
+    selection_mode = config.get('Slideshow', 'selection', fallback='shuffle')
+    recent_window = config.getint('Slideshow', 'recent_window', fallback=10)
+    favorite_folder = config.get('Slideshow', 'favorite_folder', fallback='')
+    favorite_weight = config.getint('Slideshow', 'favorite_weight', fallback=3)
+    new_photo_days = config.getint('Slideshow', 'new_photo_days', fallback=0)
+    new_photo_weight = config.getint('Slideshow', 'new_photo_weight', fallback=2)
+    motion_enabled = config.getboolean('Slideshow', 'motion', fallback=False)
+    motion_zoom = config.getfloat('Slideshow', 'motion_zoom', fallback=1.25)
+    motion_path = config.get('Slideshow', 'motion_path', fallback='random')
+    motion_fps = config.getint('Slideshow', 'motion_fps', fallback=15)
+    photo_source = config.get('Photos', 'source', fallback='local')
     photos_directory = config.get('Photos', 'photos_directory', fallback='./photos')
+    photos_url = config.get('Photos', 'photos_url', fallback='')
+    download_directory = config.get('Photos', 'download_directory', fallback='./downloaded_photos')
+    download_connections = config.getint('Photos', 'download_connections', fallback=4)
+    download_timeout = config.getint('Photos', 'download_timeout', fallback=10)
+    download_revalidate_hours = config.getfloat('Photos', 'download_revalidate_hours', fallback=24)
+    index_file = config.get('Photos', 'index_file', fallback='')
+    cache_directory = config.get('Photos', 'cache_directory', fallback='')
+    cache_size_mb = config.getint('Photos', 'cache_size_mb', fallback=512)
+    max_photo_megapixels = config.getfloat('Photos', 'max_photo_megapixels', fallback=24)
+    validate_photos = config.getboolean('Photos', 'validate_photos', fallback=True)
+    validation_jobs = config.getint('Photos', 'validation_jobs', fallback=0)
+    metrics_enabled = config.getboolean('Metrics', 'enabled', fallback=False)
+    metrics_file = config.get('Metrics', 'output_file', fallback='') or None
+    metrics_format = config.get('Metrics', 'format', fallback='prometheus')
+    metrics_interval = config.getint('Metrics', 'interval', fallback=60)
+    quality_adaptive = config.getboolean('Quality', 'adaptive', fallback=True)
+    quality_tiers = config.get('Quality', 'tiers', fallback=DEFAULT_TIERS)
 except (configparser.NoSectionError, configparser.NoOptionError):
     print("Error: Configuration missing or invalid in config.ini")
     pygame.quit()
     sys.exit(1)
 
+if memory_profile not in MEMORY_PROFILES:
+    print(f"Error: Invalid memory_profile '{memory_profile}' in config.ini (use {' or '.join(MEMORY_PROFILES)})")
+    sys.exit(1)
+
+try:
+    quality_tiers = parse_tiers(quality_tiers)
+except ValueError as e:
+    print(f"Error: {e} in config.ini")
+    sys.exit(1)
+
+try:
+    motion_paths = parse_motion_paths(motion_path)
+except ValueError as e:
+    print(f"Error: {e} in config.ini")
+    sys.exit(1)
+
+if photo_source not in ('local', 'http') or (photo_source == 'http' and not photos_url.startswith(('http://', 'https://'))):
+    print("Error: [Photos] source must be local, or http with photos_url set to an http:// or https:// URL")
+    sys.exit(1)
+
 if not os.path.isfile(font_path):
     print(f"Error: Font file '{font_path}' not found")
     pygame.quit()
     sys.exit(1)
 
+# Forked here, before the display is opened and before any of main()'s threads start, so the worker
+# processes inherit no display state; their log records are sent back to this process's log
+photo_validator = None
+if slideshow_enabled and validate_photos:
+    photo_validator = PhotoValidator((screen_width, screen_height), int(max_photo_megapixels * 1000000),
+                                     validation_jobs or None)
+
+# Frames written to the framebuffer are composed off-screen; SDL's dummy driver still provides the event queue
+if display_output == 'framebuffer':
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
+# Initialize only the pygame modules the clock uses (pygame.init() would also open audio and joysticks)
+pygame.display.init()
+pygame.font.init()
+
 # Set up the display
-if fullscreen:
+framebuffer = None
+if display_output == 'framebuffer':
+    screen = pygame.display.set_mode((screen_width, screen_height))
+    try:
+        framebuffer = FramebufferDisplay(framebuffer_device, screen_width, screen_height, framebuffer_format)
+    except (OSError, ValueError) as e:
+        print(f"Error: Cannot open framebuffer '{framebuffer_device}': {e}")
+        pygame.quit()
+        sys.exit(1)
+    if memory_profile == 'low' and framebuffer.pixel_format == 'rgb565':
+        # Compose straight into the framebuffer's 16-bit shadow surface instead of a 32-bit display surface
+        screen = framebuffer.shadow
+elif fullscreen:
     screen = pygame.display.set_mode((screen_width, screen_height), pygame.FULLSCREEN)
 else:
     screen = pygame.display.set_mode((screen_width, screen_height))
 
 pygame.display.set_caption("Japanese Watch")
 
-# Define colors
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-
-def render_text_with_border(font, text, text_color, border_color, border_width):
-    """
-    Render text with a border/outline effect.
-
-    Args:
-        font: pygame font object
-        text: string to render
-        text_color: RGB tuple for the main text color
-        border_color: RGB tuple for the border color
-        border_width: width of the border in pixels
-
-    Returns:
-        pygame surface with bordered text
-    """
-    # Render the main text to get dimensions
-    text_surface = font.render(text, True, text_color)
-    width, height = text_surface.get_size()
-
-    # Create a surface large enough for text + border
-    bordered_surface = pygame.Surface((width + border_width * 2, height + border_width * 2), pygame.SRCALPHA)
-
-    # Render border by drawing text at offset positions
-    for dx in range(-border_width, border_width + 1):
-        for dy in range(-border_width, border_width + 1):
-            if dx != 0 or dy != 0:  # Skip the center position
-                border_text = font.render(text, True, border_color)
-                bordered_surface.blit(border_text, (border_width + dx, border_width + dy))
-
-    # Render the main text on top in the center
-    bordered_surface.blit(text_surface, (border_width, border_width))
-
-    return bordered_surface
-
-def render_vertical_text(screen, combined_text, font_path, screen_width, screen_height):
-    """
-    Render text vertically in traditional Japanese style (top-to-bottom, right-to-left).
-
-    Args:
-        screen: pygame screen surface
-        combined_text: the full text string to render
-        font_path: path to the font file
-        screen_width: width of the screen
-        screen_height: height of the screen
-    """
-    total_chars = len(combined_text)
-
-    # Calculate optimal number of characters per column and number of columns
-    # We want to roughly fill the screen aspect ratio
-    aspect_ratio = screen_width / screen_height
-    chars_per_column = int((total_chars / aspect_ratio) ** 0.5)
-    chars_per_column = max(chars_per_column, 10)  # Minimum 10 chars per column
-
-    # Calculate number of columns needed
-    num_columns = (total_chars + chars_per_column - 1) // chars_per_column
-
-    # Split text into columns
-    columns = []
-    for i in range(0, total_chars, chars_per_column):
-        columns.append(combined_text[i:i+chars_per_column])
-
-    # Calculate font size that fits all characters on screen
-    # Account for character height being roughly 1.2x font size
-    char_height_factor = 1.2
-    estimated_font_size = int(screen_height / (chars_per_column * char_height_factor))
-    # Also check width constraint (need space for all columns)
-    width_based_font = int(screen_width / (num_columns * 1.0))
-    font_size = min(estimated_font_size, width_based_font)
-    font_size = max(font_size, 10)  # Minimum font size
-
-    font = pygame.font.Font(font_path, font_size)
-
-    # Render all characters with black border
-    border_width = max(2, int(font_size * 0.05))  # Scale border with font size
-
-    # Calculate column width (use the widest character as reference)
-    # For simplicity, use a representative character
-    test_surface = render_text_with_border(font, "あ", WHITE, BLACK, border_width)
-    char_width = test_surface.get_width()
-    char_height = test_surface.get_height()
-
-    # Calculate total width of all columns
-    total_columns_width = num_columns * char_width
-    # Calculate horizontal spacing to distribute columns across screen
-    horizontal_padding = (screen_width - total_columns_width) / (num_columns + 1)
-
-    # Calculate vertical spacing between characters
-    total_column_height = chars_per_column * char_height
-    if total_column_height < screen_height:
-        vertical_spacing = (screen_height - total_column_height) / (chars_per_column + 1)
-    else:
-        vertical_spacing = 0
-        # Recalculate font size if it doesn't fit
-        font_size = int(screen_height / (chars_per_column * char_height_factor))
-        font = pygame.font.Font(font_path, font_size)
-        border_width = max(2, int(font_size * 0.05))
-        test_surface = render_text_with_border(font, "あ", WHITE, BLACK, border_width)
-        char_width = test_surface.get_width()
-        char_height = test_surface.get_height()
-        vertical_spacing = (screen_height - chars_per_column * char_height) / (chars_per_column + 1)
-        total_columns_width = num_columns * char_width
-        horizontal_padding = (screen_width - total_columns_width) / (num_columns + 1)
-
-    # Draw each column from right to left
-    for col_idx, column in enumerate(columns):
-        # Calculate x position for this column (right to left)
-        # Start from the right side
-        column_x = screen_width - (col_idx + 1) * char_width - (col_idx + 1) * horizontal_padding
-
-        # Draw each character in the column from top to bottom
-        current_y = vertical_spacing
-        for char in column:
-            if char:  # Skip empty characters
-                char_surface = render_text_with_border(font, char, WHITE, BLACK, border_width)
-                # Center the character horizontally within the column
-                char_x = column_x + (char_width - char_surface.get_width()) // 2
-                screen.blit(char_surface, (char_x, current_y))
-                current_y += char_height + vertical_spacing
-
-def get_japanese_number(number, category):
-    if category == "minute":
-        minute_exceptions = {
-            1: "いっぷん", 2: "にふん", 3: "さんぷん", 4: "よんぷん", 5: "ごふん",
-            6: "ろっぷん", 7: "ななふん", 8: "はっぷん", 9: "きゅうふん", 10: "じゅっぷん",
-            11: "じゅういっぷん", 12: "じゅうにふん", 13: "じゅうさんぷん", 14: "じゅうよんぷん", 15: "じゅうごふん",
-            16: "じゅうろっぷん", 17: "じゅうななふん", 18: "じゅうはっぷん", 19: "じゅうきゅうふん", 20: "にじゅっぷん",
-            21: "にじゅういっぷん", 22: "にじゅうにふん", 23: "にじゅうさんぷん", 24: "にじゅうよんぷん", 25: "にじゅごふん",
-            26: "にじゅうろっぷん", 27: "にじゅうななふん", 28: "にじゅうはっぷん", 29: "にじゅうきゅうふん", 30: "はん",
-            31: "さんじゅういっぷん", 32: "さんじゅうにふん", 33: "さんじゅうさんぷん", 34: "さんじゅうよんぷん", 35: "さんじゅうごふん",
-            36: "さんじゅうろっぷん", 37: "さんじゅうななふん", 38: "さんじゅうはっぷん", 39: "さんじゅうきゅうふん", 40: "よんじゅっぷん",
-            41: "よんじゅういっぷん", 42: "よんじゅうにふん", 43: "よんじゅうさんぷん", 44: "よんじゅうよんぷん", 45: "よんじゅうごふん",
-            46: "よんじゅうろっぷん", 47: "よんじゅうななふん", 48: "よんじゅうはっぷん", 49: "よんじゅうきゅうふん", 50: "ごじゅっぷん",
-            51: "ごじゅういっぷん", 52: "ごじゅうにふん", 53: "ごじゅうさんぷん", 54: "ごじゅうよんぷん", 55: "ごじゅうごふん",
-            56: "ごじゅうろっぷん", 57: "ごじゅうななふん", 58: "ごじゅうはっぷん", 59: "ごじゅうきゅうふん"
-        }
-        if number in minute_exceptions:
-            return minute_exceptions[number]
-        elif number < 10:
-            return get_japanese_number(number, "default") + "ふん"
-        else:
-            return get_japanese_number(number // 10, "default") + "じゅう" + get_japanese_number(number % 10, "default") + "ふん"
-    elif category == "day":
-        day_exceptions = {
-            1: "ついたち", 2: "ふつか", 3: "みっか", 4: "よっか", 5: "いつか", 6: "むいか", 7: "なのか",
-            8: "ようか", 9: "ここのか", 10: "とおか", 11: "じゅういちにち", 12: "じゅうににち", 13: "じゅうさんにち",
-            14: "じゅうよっか", 15: "じゅうごにち", 16: "じゅうろくにち", 17: "じゅうしちにち", 18: "じゅうはちにち",
-            19: "じゅうくにち", 20: "はつか", 21: "にじゅういちにち", 22: "にじゅうににち", 23: "にじゅうさんにち",
-            24: "にじゅうよっか", 25: "にじゅうごにち", 26: "にじゅうろくにち", 27: "にじゅうしちにち",
-            28: "にじゅうはちにち", 29: "にじゅうくにち", 30: "さんじゅうにち", 31: "さんじゅういちにち"
-        }
-        return day_exceptions[number]
-    elif category == "hour":
-        hour_exceptions = {
-            0: "じゅうにじ", 1: "いちじ", 2: "にじ", 3: "さんじ", 4: "よじ", 5: "ごじ", 6: "ろくじ", 7: "しちじ", 8: "はちじ",
-            9: "くじ", 10: "じゅうじ", 11: "じゅういちじ", 12: "じゅうにじ"
-        }
-        return hour_exceptions[number]
-    elif category == "year":
-        digits = [int(d) for d in str(number)]
-        year_hiragana = ""
-        if number >= 1000:
-            thousand_digit = digits[-4]
-            year_hiragana += get_japanese_number(thousand_digit, "default") + "せん"
-            number %= 1000
-        if number >= 100:
-            hundred_digit = digits[-3]
-            year_hiragana += get_japanese_number(hundred_digit, "default") + "ひゃく"
-            number %= 100
-        if number >= 10:
-            ten_digit = digits[-2]
-            year_hiragana += get_japanese_number(ten_digit, "default") + "じゅう"
-            number %= 10
-        if number > 0:
-            year_hiragana += get_japanese_number(number, "default")
-        year_hiragana += "ねん"
-        return year_hiragana
-    else:
-        japanese_numbers = [
-            "", "いち", "に", "さん", "よん", "ご", "ろく", "なな", "はち", "きゅう"
-        ]
-        if number < 10:
-            return japanese_numbers[number]
-        elif number < 20:
-            return "じゅう" + japanese_numbers[number % 10]
-        else:
-            return japanese_numbers[number // 10] + "じゅう" + japanese_numbers[number % 10]
-
 def main():
     global screen, fullscreen
     running = True
     fullscreen = False
 
+    metrics.configure(metrics_enabled, metrics_file, metrics_format, metrics_interval)
+
     # Initialize PhotoManager and Slideshow if enabled
     photo_manager = None
     if slideshow_enabled:
-        photo_manager = PhotoManager(photos_directory=photos_directory)
-        slideshow = Slideshow(screen, photo_manager, transition_time)
+        if photo_source == 'http':
+            source = HttpPhotoSource(photos_url, download_directory, PhotoManager.SUPPORTED_FORMATS,
+                                     download_connections, download_timeout, download_revalidate_hours * 3600)
+        else:
+            source = LocalPhotoSource(photos_directory, index_file or None, PhotoManager.SUPPORTED_FORMATS)
+        photo_weights = PhotoWeights(source, favorite_folder, favorite_weight, new_photo_days, new_photo_weight)
+        selector = PhotoSelector(selection_mode, recent_window, photo_weights if photo_weights.enabled() else None)
+        photo_manager = PhotoManager(selector=selector, source=source, validator=photo_validator)
+        rendition_cache = None
+        if cache_directory:
+            rendition_cache = RenditionCache(cache_directory, cache_size_mb * 1024 * 1024)
+        surface_cache = None
+        if surface_cache_mb > 0:
+            surface_cache = SurfaceCache(surface_cache_mb * 1024 * 1024)
+        slideshow = Slideshow(screen, photo_manager, transition_time, prefetch_count, rendition_cache,
+                              surface_cache, fade_duration, int(max_photo_megapixels * 1000000), memory_profile,
+                              motion_enabled, motion_zoom, motion_paths, max(1, motion_fps))
     else:
         slideshow = None
 
-    clock = pygame.time.Clock()
+    # Steps down to cheaper drawing when animated frames take longer than the frame rate allows
+    governor = QualityGovernor(quality_tiers, quality_adaptive)
+    logging.info(f"Quality tier 1/{len(quality_tiers)} ({describe_tier(governor.tier)})"
+                 + (", adaptive" if quality_adaptive and len(quality_tiers) > 1 else ""))
+    scheduler = Scheduler(fps=governor.tier.fps)
+    if slideshow:
+        slideshow.set_quality(governor.tier.fps, governor.tier.smooth_scaling)
+    pending_events = []
+    compositor = Compositor(screen, BLACK)
+    last_text = None
+    first_frame = True
 
     last_photo_check = time.time()
     PHOTO_CHECK_INTERVAL = 300  # Check every 5 minutes
 
     while running:
-        logging.debug(f"Main loop iteration at {datetime.datetime.now()}")
+        logging.debug("Main loop iteration")
         try:
+            frame_start = time.perf_counter()
             current_time = time.time()
             if slideshow_enabled and current_time - last_photo_check > PHOTO_CHECK_INTERVAL:
                 logging.info("Performing periodic photo check")
@@ -290,128 +246,79 @@ def main():
                     logging.info(f"Current photo: {slideshow.current_photo}")
                 else:
                     logging.warning("No current photo")
+                if slideshow.surface_cache is not None:
+                    slideshow.surface_cache.log_stats()
+                slideshow.log_memory()
                 last_photo_check = current_time
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        running = False
-                    elif event.key == pygame.K_RETURN and event.mod & pygame.KMOD_ALT:
-                        fullscreen = not fullscreen
-                        if fullscreen:
-                            screen = pygame.display.set_mode((screen_width, screen_height), pygame.FULLSCREEN)
-                        else:
-                            screen = pygame.display.set_mode((screen_width, screen_height))
-                    elif event.key == pygame.K_c and event.mod & pygame.KMOD_CTRL:
+            with metrics.stage('events'):
+                for event in pending_events:
+                    if event.type == pygame.QUIT:
                         running = False
-
-            # Clear the screen
-            screen.fill(BLACK)
-
-            # Update and draw slideshow if enabled
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_ESCAPE:
+                            running = False
+                        elif event.key == pygame.K_RETURN and event.mod & pygame.KMOD_ALT:
+                            fullscreen = not fullscreen
+                            if fullscreen:
+                                screen = pygame.display.set_mode((screen_width, screen_height), pygame.FULLSCREEN)
+                            else:
+                                screen = pygame.display.set_mode((screen_width, screen_height))
+                            compositor.set_screen(screen)
+                        elif event.key == pygame.K_c and event.mod & pygame.KMOD_CTRL:
+                            running = False
+
+            # Update the slideshow layers if enabled
             if slideshow:
-                slideshow.update()
-                slideshow.draw()
-
-            # Get the current date and time
-            now = datetime.datetime.now()
-
-            # Format the date in Japanese
-            year = get_japanese_number(now.year, "year")
-            month = get_japanese_number(now.month, "default") + "がつ"
-            day = get_japanese_number(now.day, "day")
-
-            # Temporarily switch locale to English to get the abbreviated day name
-            locale.setlocale(locale.LC_TIME, 'en_US.UTF-8')
-            weekday = now.strftime("%a")
-            locale.setlocale(locale.LC_TIME, 'ja_JP.UTF-8')  # Switch back to Japanese locale
-
-            weekday_mapping = {
-                "Sun": "にちようび",
-                "Mon": "げつようび",
-                "Tue": "かようび",
-                "Wed": "すいようび",
-                "Thu": "もくようび",
-                "Fri": "きんようび",
-                "Sat": "どようび"
-            }
-            weekday_text = weekday_mapping[weekday]
-            date_text = f"きょうは{year}{month}{day}{weekday_text}です。"
-
-            # Format the time in Japanese
-            hour = now.hour
-            is_pm = hour >= 12
-            hour = hour % 12
-            if hour == 0:
-                hour = 12
-
-            if hour == 12 and now.minute == 0:
-                if is_pm:
-                    time_text = "いまはごごじゅうにじです。"
-                else:
-                    time_text = "いまはごぜんれいじです。"
-            else:
-                hour_text = get_japanese_number(hour, "hour")
-                am_pm = "ごご" if is_pm else "ごぜん"
-                if now.minute == 0:
-                    time_text = f"いまは{am_pm}{hour_text}です。"
-                else:
-                    minute = get_japanese_number(now.minute, "minute")
-                    time_text = f"いまは{am_pm}{hour_text}{minute}です。"
-
-            # Combine all text into one string
-            combined_text = date_text + time_text
-
-            # Render text based on orientation setting
-            if text_orientation == "vertical":
-                # Traditional Japanese vertical text (top-to-bottom, right-to-left)
-                render_vertical_text(screen, combined_text, font_path, screen_width, screen_height)
-            else:
-                # Horizontal text (left-to-right, top-to-bottom)
-                total_chars = len(combined_text)
-
-                # Calculate optimal number of lines and characters per line
-                # We want to roughly fill the screen aspect ratio
-                aspect_ratio = screen_width / screen_height
-                chars_per_line = int((total_chars * aspect_ratio) ** 0.5)
-                chars_per_line = max(chars_per_line, 10)  # Minimum 10 chars per line
-
-                # Split text into lines
-                lines = []
-                for i in range(0, total_chars, chars_per_line):
-                    lines.append(combined_text[i:i+chars_per_line])
-
-                # Calculate font size that fits all lines on screen
-                # Account for line height being roughly 1.2x font size
-                line_height_factor = 1.2
-                estimated_font_size = int(screen_height / (len(lines) * line_height_factor))
-                # Also check width constraint
-                max_line_length = max(len(line) for line in lines)
-                width_based_font = int(screen_width / (max_line_length * 0.6))
-                font_size = min(estimated_font_size, width_based_font)
-
-                font = pygame.font.Font(font_path, font_size)
-
-                # Render all lines with black border
-                border_width = max(2, int(font_size * 0.05))  # Scale border with font size
-                line_surfaces = [render_text_with_border(font, line, WHITE, BLACK, border_width) for line in lines]
-
-                # Calculate total height of all lines
-                total_text_height = sum(surface.get_height() for surface in line_surfaces)
-                # Calculate vertical spacing to distribute lines across screen
-                vertical_padding = (screen_height - total_text_height) / (len(lines) + 1)
-
-                # Draw each line centered horizontally, distributed vertically
-                current_y = vertical_padding
-                for line_surface in line_surfaces:
-                    line_x = (screen_width - line_surface.get_width()) // 2
-                    screen.blit(line_surface, (line_x, current_y))
-                    current_y += line_surface.get_height() + vertical_padding
-
-            # Update the display
-            pygame.display.flip()
+                with metrics.stage('slideshow_update'):
+                    slideshow.update()
+                    slideshow.set_layers(compositor)
+
+            with metrics.stage('phrase'):
+                # Get the current date and time
+                now = datetime.datetime.now()
+
+                # Look up the date and time phrases in the precomputed tables
+                combined_text = clock_phrase(now)
+
+            # Re-render the text layer only when the text changes (once a minute)
+            if combined_text != last_text:
+                with metrics.stage('text_layer'):
+                    text_layer = render_text_layer(combined_text, font_path, screen_width, screen_height, text_orientation,
+                                                   text_shadow, governor.tier.text_outline)
+                    text_rect = text_layer.get_bounding_rect()
+                    text_layer = convert_text_layer(text_layer, screen, memory_profile)
+                    compositor.set_layer('text', text_layer, rect=text_rect)
+                last_text = combined_text
+
+            # Push only the changed areas to the display
+            with metrics.stage('blit'):
+                dirty_rects = compositor.compose()
+            if dirty_rects:
+                with metrics.stage('flip'):
+                    if framebuffer:
+                        framebuffer.update(screen, dirty_rects)
+                    else:
+                        pygame.display.update(dirty_rects)
+            frame_time = time.perf_counter() - frame_start
+            metrics.record('frame', frame_time)
+
+            # Only animated frames have a deadline; idle ones wait for the next minute anyway
+            if slideshow and slideshow.animating():
+                previous_tier = governor.tier
+                if governor.observe(frame_time):
+                    scheduler.fps = governor.tier.fps
+                    slideshow.set_quality(governor.tier.fps, governor.tier.smooth_scaling)
+                    if governor.tier.text_outline != previous_tier.text_outline:
+                        # Redraw the text with or without its outline on the next frame
+                        last_text = None
+
+            if first_frame:
+                time_to_first_frame = time.perf_counter() - startup_time
+                metrics.record('time_to_first_frame', time_to_first_frame)
+                logging.info("First frame shown %.3f seconds after startup", time_to_first_frame)
+                print(f"First frame shown {time_to_first_frame:.3f} seconds after startup")
+                first_frame = False
 
         except Exception as e:
             logging.error(f"An error occurred in main loop: {e}")
@@ -419,8 +326,23 @@ def main():
             print("Attempting to continue...")
             time.sleep(5)  # Wait for 5 seconds before continuing
 
-        # Control the frame rate
-        clock.tick(30)  # 30 FPS
+        # Sleep until the next minute or slideshow change, or run at 30 FPS while a transition is animating
+        if not running:
+            break
+        metrics.write_if_due()
+        if slideshow:
+            pending_events = scheduler.wait(animating=slideshow.transitioning,
+                                            next_deadline=slideshow.time_until_change())
+        else:
+            pending_events = scheduler.wait()
+
+    # Stop background work before shutting pygame down
+    if slideshow:
+        slideshow.stop()
+        photo_manager.close()
+    metrics.flush()
+    if framebuffer:
+        framebuffer.close()
 
     # Quit Pygame
     pygame.quit()
@@ -429,5 +351,6 @@ if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
+        metrics.flush()
         pygame.quit()
         sys.exit()
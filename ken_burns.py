@@ -0,0 +1,157 @@
+import random
+import pygame
+import logging
+
+# Pan and zoom paths, as (start zoom, end zoom, start center, end center) in fractions of the photo;
+# None zooms are replaced by the configured zoom
+MOTION_PATHS = {
+    'zoom_in': (1.0, None, (0.5, 0.5), (0.5, 0.5)),
+    'zoom_out': (None, 1.0, (0.5, 0.5), (0.5, 0.5)),
+    'pan_left': (None, None, (1.0, 0.5), (0.0, 0.5)),
+    'pan_right': (None, None, (0.0, 0.5), (1.0, 0.5)),
+    'pan_up': (None, None, (0.5, 1.0), (0.5, 0.0)),
+    'pan_down': (None, None, (0.5, 0.0), (0.5, 1.0)),
+}
+
+def parse_motion_paths(value):
+    """
+    Parse the motion_path option: 'random' or a comma-separated list of MOTION_PATHS names.
+
+    Returns:
+        list of path names, each photo picks one of them at random
+    """
+    if value.strip() == 'random':
+        return list(MOTION_PATHS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    for name in names:
+        if name not in MOTION_PATHS:
+            raise ValueError(f"Unknown motion path: {name} (use random or {', '.join(MOTION_PATHS)})")
+    return names or list(MOTION_PATHS)
+
+def smoothstep(progress):
+    progress = min(1.0, max(0.0, progress))
+    return progress * progress * (3 - 2 * progress)
+
+def scale_to(surface, size, dest=None, smooth=True):
+    """Smoothly scale when asked and the surface format allows it (24/32 bits), else use the plain scaler."""
+    if smooth and surface.get_bitsize() >= 24:
+        if dest is not None:
+            return pygame.transform.smoothscale(surface, size, dest)
+        return pygame.transform.smoothscale(surface, size)
+    if dest is not None:
+        return pygame.transform.scale(surface, size, dest)
+    return pygame.transform.scale(surface, size)
+
+class PhotoPyramid:
+    def __init__(self, photo, frame_size):
+        """
+        Pre-scaled levels of a photo, each half the size of the previous one.
+
+        The largest level is the photo as decoded (frame_size times the
+        maximum zoom); levels are added while they are still at least
+        frame_size, so any crop shown at any zoom can be taken from a level
+        no more than twice the frame size.
+
+        Args:
+            photo: photo surface, frame_size times the maximum zoom
+            frame_size: (width, height) of the frames rendered from it
+        """
+        self.frame_size = frame_size
+        self.levels = [photo]
+        while True:
+            width, height = self.levels[-1].get_size()
+            if width // 2 < frame_size[0] or height // 2 < frame_size[1]:
+                break
+            self.levels.append(scale_to(self.levels[-1], (width // 2, height // 2)))
+
+    def level_for(self, zoom):
+        """Return the smallest level whose crop at this zoom still covers the frame size."""
+        for level in reversed(self.levels):
+            if level.get_width() / zoom >= self.frame_size[0] and level.get_height() / zoom >= self.frame_size[1]:
+                return level
+        return self.levels[0]
+
+class MotionPhoto:
+    def __init__(self, pyramid, path, max_zoom):
+        """
+        A photo slowly panned and zoomed along a path while it is shown.
+
+        Every frame crops the visible area from the nearest pyramid level
+        with a subsurface and scales it into a reused frame surface, so a
+        frame costs one scale of at most twice the frame size, whatever the
+        resolution of the original photo.
+
+        Args:
+            pyramid: PhotoPyramid of the photo
+            path: name of one of MOTION_PATHS
+            max_zoom: zoom at the zoomed-in end of the path (1.0 shows the whole photo)
+        """
+        self.pyramid = pyramid
+        self.path = path
+        start_zoom, end_zoom, self.start_center, self.end_center = MOTION_PATHS[path]
+        self.start_zoom = max_zoom if start_zoom is None else start_zoom
+        self.end_zoom = max_zoom if end_zoom is None else end_zoom
+        self.frame = pygame.Surface(pyramid.frame_size, 0, pyramid.levels[0])
+        self.start_time = None
+        self.duration = 1
+        self.last_progress = None
+
+    @classmethod
+    def create(cls, photo, frame_size, paths, max_zoom):
+        """Build the pyramid for a loaded photo and pick its path among paths at random."""
+        return cls(PhotoPyramid(photo, frame_size), random.choice(paths), max_zoom)
+
+    def start(self, start_time, duration):
+        """Start the motion; it takes duration seconds from start_time."""
+        self.start_time = start_time
+        self.duration = max(duration, 0.001)
+        self.last_progress = None
+
+    def moving(self):
+        """Return True until the end of the path has been rendered."""
+        return self.last_progress is None or self.last_progress < 1.0
+
+    def get_size(self):
+        return self.frame.get_size()
+
+    def get_rect(self, **kwargs):
+        return self.frame.get_rect(**kwargs)
+
+    def crop(self, progress):
+        """Return the pyramid level and the rectangle of it visible at a point of the path."""
+        eased = smoothstep(progress)
+        zoom = self.start_zoom + (self.end_zoom - self.start_zoom) * eased
+        level = self.pyramid.level_for(zoom)
+        level_width, level_height = level.get_size()
+        crop_width = min(level_width, max(1, round(level_width / zoom)))
+        crop_height = min(level_height, max(1, round(level_height / zoom)))
+        center_x = self.start_center[0] + (self.end_center[0] - self.start_center[0]) * eased
+        center_y = self.start_center[1] + (self.end_center[1] - self.start_center[1]) * eased
+        # The center moves over the range that keeps the crop inside the photo
+        left = round((level_width - crop_width) * center_x)
+        top = round((level_height - crop_height) * center_y)
+        return level, pygame.Rect(left, top, crop_width, crop_height)
+
+    def render(self, now, smooth=True):
+        """
+        Draw the frame for a point in time into the frame surface, with the plain scaler unless smooth.
+
+        Returns:
+            bool: True if the frame changed
+        """
+        progress = 0.0 if self.start_time is None else (now - self.start_time) / self.duration
+        progress = min(1.0, max(0.0, progress))
+        if progress == self.last_progress:
+            return False
+        self.last_progress = progress
+        level, rect = self.crop(progress)
+        try:
+            scale_to(level.subsurface(rect), self.frame.get_size(), self.frame, smooth)
+        except (ValueError, pygame.error) as e:
+            logging.debug("Ken Burns frame failed: %s", e)
+            return False
+        return True
+
+    def surfaces(self):
+        """Return every surface held: the pyramid levels and the frame."""
+        return self.pyramid.levels + [self.frame]
@@ -0,0 +1,119 @@
+import os
+import time
+import datetime
+import multiprocessing
+import pygame
+from hiragana_clock import clock_phrase
+from text_renderer import render_text_layer, BLACK
+
+# File extension of each export format; raw frames are packed 8-bit RGB rows, no header
+FORMAT_EXTENSIONS = {'png': '.png', 'raw': '.rgb'}
+
+# Set in each worker process by init_worker()
+_settings = None
+_frame = None
+
+def frame_path(output_directory, moment, output_format):
+    """Path of the frame for one minute: <output_directory>/YYYY-MM-DD/HHMM.<ext>."""
+    return os.path.join(output_directory, moment.strftime('%Y-%m-%d'),
+                        moment.strftime('%H%M') + FORMAT_EXTENSIONS[output_format])
+
+def minutes_between(start_date, end_date):
+    """Yield a datetime for every minute from the start of start_date to the end of end_date."""
+    moment = datetime.datetime.combine(start_date, datetime.time())
+    end = datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time())
+    while moment < end:
+        yield moment
+        moment += datetime.timedelta(minutes=1)
+
+def init_worker(font_path, width, height, orientation, output_directory, output_format, shadow):
+    global _settings, _frame
+    # Frames are drawn off-screen; only the font module is needed
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.font.init()
+    _settings = (font_path, width, height, orientation, output_directory, output_format, shadow)
+    # One frame surface per worker, cleared for every minute
+    _frame = pygame.Surface((width, height))
+
+def render_minutes(moments):
+    """Render and save the frames of a batch of minutes in a worker. Returns the number saved."""
+    font_path, width, height, orientation, output_directory, output_format, shadow = _settings
+    for moment in moments:
+        # The same phrase tables and glyph atlas as the live display, so frames match it exactly
+        text_layer = render_text_layer(clock_phrase(moment), font_path, width, height, orientation, shadow)
+        _frame.fill(BLACK)
+        _frame.blit(text_layer, (0, 0))
+        save_frame(_frame, frame_path(output_directory, moment, output_format), output_format)
+    return len(moments)
+
+def save_frame(frame, path, output_format):
+    # Write under a temporary name, so an interrupted export never leaves a partial frame that would be skipped
+    temp_path = path[:-len(FORMAT_EXTENSIONS[output_format])] + '.tmp' + FORMAT_EXTENSIONS[output_format]
+    if output_format == 'raw':
+        with open(temp_path, 'wb') as f:
+            f.write(pygame.image.tostring(frame, 'RGB'))
+    else:
+        pygame.image.save(frame, temp_path)
+    os.replace(temp_path, path)
+
+def export_frames(output_directory, font_path, width, height, orientation="horizontal", output_format='png',
+                  start_date=None, end_date=None, jobs=None, shadow=False):
+    """
+    Render the clock for every minute of a range of days to image files.
+
+    Frames already present in output_directory are skipped, so an
+    interrupted export can be resumed. The work is split into batches of
+    one hour and spread over a pool of processes.
+
+    Args:
+        output_directory: directory receiving one subdirectory per day
+        font_path: path to the font file
+        width: width of the frames
+        height: height of the frames
+        orientation: "horizontal" or "vertical"
+        output_format: 'png' or 'raw' (8-bit RGB rows, width * height * 3 bytes)
+        start_date: first day (datetime.date), default today
+        end_date: last day (datetime.date), default start_date
+        jobs: number of worker processes, default one per CPU core
+        shadow: draw a soft shadow behind the text
+
+    Returns:
+        tuple: (frames rendered, frames skipped)
+    """
+    if output_format not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unsupported export format: {output_format}")
+    start_date = start_date or datetime.date.today()
+    end_date = end_date or start_date
+    jobs = jobs or os.cpu_count() or 1
+
+    # Start of the hour -> minutes of that hour still to render
+    batches = {}
+    skipped = 0
+    for moment in minutes_between(start_date, end_date):
+        if os.path.exists(frame_path(output_directory, moment, output_format)):
+            skipped += 1
+            continue
+        batches.setdefault(moment.replace(minute=0), []).append(moment)
+    for moment in batches:
+        os.makedirs(os.path.dirname(frame_path(output_directory, moment, output_format)), exist_ok=True)
+    batches = list(batches.values())
+    total = sum(len(batch) for batch in batches)
+    print(f"Exporting {total} frames at {width}x{height} {orientation} to {output_directory} "
+          f"with {jobs} processes ({skipped} already rendered)")
+    if not total:
+        return 0, skipped
+
+    start_time = time.perf_counter()
+    rendered = 0
+    # Fork, so workers inherit the imported modules without re-running the clock's startup code
+    context = multiprocessing.get_context('fork')
+    with context.Pool(jobs, init_worker,
+                      (font_path, width, height, orientation, output_directory, output_format, shadow)) as pool:
+        for count in pool.imap_unordered(render_minutes, batches):
+            rendered += count
+            elapsed = time.perf_counter() - start_time
+            print(f"\r{rendered}/{total} frames, {rendered / elapsed:.1f} frames/s", end='', flush=True)
+    elapsed = time.perf_counter() - start_time
+    print(f"\nRendered {rendered} frames in {elapsed:.1f} seconds ({rendered / elapsed:.1f} frames/s, "
+          f"{rendered / elapsed / jobs:.1f} per process)")
+    return rendered, skipped
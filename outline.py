@@ -0,0 +1,125 @@
+import collections
+import pygame
+
+# Soft shadow behind outlined text: offset down and right, blur radius (pixels) and RGBA color
+Shadow = collections.namedtuple('Shadow', ('offset', 'blur', 'color'))
+
+def shadow_for(border_width):
+    """The soft shadow used for a border width: offset by the border, blurred over twice its width."""
+    return Shadow(border_width, border_width * 2, (0, 0, 0, 160))
+
+def spread(surface, length, horizontal):
+    """
+    Composite length copies of a surface, shifted by 0 .. length-1 pixels right or down.
+
+    Copies are alpha blended over each other, as blitting them one by one
+    would, but only O(log length) whole-surface blits are made: blocks
+    of 1, 2, 4, ... shifted copies are built by doubling, and the blocks
+    matching the binary digits of length are blended together, so every
+    shift is counted exactly once.
+    """
+    def shifted(distance):
+        return (distance, 0) if horizontal else (0, distance)
+
+    result = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+    block = surface
+    block_length = 1
+    offset = 0
+    while block_length <= length:
+        if length & block_length:
+            result.blit(block, shifted(offset))
+            offset += block_length
+        if block_length * 2 <= length:
+            doubled = block.copy()
+            doubled.blit(block, shifted(block_length))
+            block = doubled
+        block_length *= 2
+    return result
+
+def outline(mask, border_width):
+    """
+    Dilate a rendered glyph or string into its outline.
+
+    The result is the mask blended at every offset in a square of
+    (2 * border_width + 1) pixels, like drawing it at each (dx, dy) in
+    [-border_width, border_width], but made of two separable passes of
+    spread(), so the cost grows with log(border_width) instead of its square.
+
+    Args:
+        mask: text rendered (antialiased) in the border color
+        border_width: width of the border in pixels
+
+    Returns:
+        pygame surface border_width larger than mask on every side
+    """
+    width, height = mask.get_size()
+    padded = pygame.Surface((width + border_width * 2, height + border_width * 2), pygame.SRCALPHA)
+    # Spreading right and down from the top-left corner is the same as spreading both ways from the center
+    padded.blit(mask, (0, 0))
+    window = border_width * 2 + 1
+    return spread(spread(padded, window, True), window, False)
+
+def soft_shadow(silhouette, shadow):
+    """
+    Blur a silhouette into a soft shadow.
+
+    The blur is a smoothscale down and back up, which is cheap and close
+    to a box blur of the given radius.
+
+    Args:
+        silhouette: surface whose alpha gives the shape (e.g. an outline)
+        shadow: Shadow
+
+    Returns:
+        pygame surface as large as silhouette plus shadow.offset + shadow.blur on the right and bottom,
+        with the shape's top-left at (shadow.offset, shadow.offset)
+    """
+    width, height = silhouette.get_size()
+    extent = shadow.offset + shadow.blur
+    shape = pygame.Surface((width + shadow.blur * 2, height + shadow.blur * 2), pygame.SRCALPHA)
+    shape.fill(shadow.color)
+    # Keep the color, take the alpha from the silhouette scaled by the shadow's opacity
+    alpha = pygame.Surface(silhouette.get_size(), pygame.SRCALPHA)
+    alpha.fill((255, 255, 255, 0))
+    alpha.blit(silhouette, (0, 0))
+    alpha.fill((255, 255, 255, 255), special_flags=pygame.BLEND_RGB_MAX)
+    mask = pygame.Surface(shape.get_size(), pygame.SRCALPHA)
+    mask.blit(alpha, (shadow.blur, shadow.blur))
+    shape.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+
+    if shadow.blur > 0:
+        small = (max(1, shape.get_width() // shadow.blur), max(1, shape.get_height() // shadow.blur))
+        shape = pygame.transform.smoothscale(pygame.transform.smoothscale(shape, small), shape.get_size())
+
+    shadow_surface = pygame.Surface((width + extent, height + extent), pygame.SRCALPHA)
+    shadow_surface.blit(shape, (shadow.offset - shadow.blur, shadow.offset - shadow.blur))
+    return shadow_surface
+
+def _legacy_outline(mask, border_width):
+    # The per-offset blits the renderer used before outline(), kept to validate it
+    width, height = mask.get_size()
+    border_surface = pygame.Surface((width + border_width * 2, height + border_width * 2), pygame.SRCALPHA)
+    for dx in range(-border_width, border_width + 1):
+        for dy in range(-border_width, border_width + 1):
+            if dx != 0 or dy != 0:  # Skip the center position
+                border_surface.blit(mask, (border_width + dx, border_width + dy))
+    return border_surface
+
+def alpha_difference(first, second):
+    """
+    Compare the alpha channels of two surfaces of the same size.
+
+    Returns:
+        tuple: (largest difference, mean difference) in 0-255 alpha steps
+    """
+    # Difference of the alpha channels, without NumPy: subtract both ways and add
+    a = pygame.Surface(first.get_size(), pygame.SRCALPHA)
+    b = pygame.Surface(first.get_size(), pygame.SRCALPHA)
+    a.blit(first, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
+    b.blit(second, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
+    forward = a.copy()
+    forward.blit(b, (0, 0), special_flags=pygame.BLEND_RGBA_SUB)
+    b.blit(a, (0, 0), special_flags=pygame.BLEND_RGBA_SUB)
+    forward.blit(b, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
+    alphas = pygame.image.tostring(forward, 'RGBA')[3::4]
+    return max(alphas), sum(alphas) / len(alphas)
@@ -0,0 +1,163 @@
+import struct
+import pygame
+import logging
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# EXIF tag holding the camera orientation
+ORIENTATION_TAG = 0x0112
+# Orientations whose correction swaps width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+def fit_size(size, target_size):
+    """Return the largest size with the aspect ratio of size that fits in target_size."""
+    scale = min(target_size[0] / size[0], target_size[1] / size[1])
+    return max(1, int(size[0] * scale)), max(1, int(size[1] * scale))
+
+def image_size(path):
+    """
+    Read the pixel size of a JPEG, PNG, GIF or BMP from its header, without decoding it.
+
+    Returns:
+        tuple: (width, height), or None if the format is not recognized
+    """
+    with open(path, 'rb') as f:
+        header = f.read(26)
+        if header.startswith(b'\x89PNG\r\n\x1a\n'):
+            return struct.unpack('>II', header[16:24])
+        if header[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', header[6:10])
+        if header.startswith(b'BM'):
+            width, height = struct.unpack('<ii', header[18:26])
+            return width, abs(height)
+        if header.startswith(b'\xff\xd8'):
+            f.seek(2)
+            for marker, segment_start, length in jpeg_segments(f):
+                # Start-of-frame markers, except DHT (C4), JPG (C8) and DAC (CC)
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack('>HH', f.read(5)[1:5])
+                    return width, height
+    return None
+
+def jpeg_segments(f):
+    """Yield (marker, data offset, data length) for each JPEG segment up to the image data."""
+    while True:
+        prefix = f.read(2)
+        if len(prefix) < 2 or prefix[0] != 0xFF:
+            return
+        marker = prefix[1]
+        if marker == 0xDA:
+            # Start of scan: compressed data follows
+            return
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return
+        length = struct.unpack('>H', length_bytes)[0] - 2
+        start = f.tell()
+        yield marker, start, length
+        f.seek(start + length)
+
+def exif_orientation(path):
+    """Read the EXIF orientation (1-8) of a JPEG, or 1 if it has none."""
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return 1
+        for marker, segment_start, length in jpeg_segments(f):
+            if marker != 0xE1:
+                continue
+            data = f.read(length)
+            if not data.startswith(b'Exif\x00\x00'):
+                continue
+            tiff = data[6:]
+            try:
+                endian = '<' if tiff[:2] == b'II' else '>'
+                ifd_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+                entry_count = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])[0]
+                for i in range(entry_count):
+                    entry = ifd_offset + 2 + i * 12
+                    tag, value_type = struct.unpack(endian + 'HH', tiff[entry:entry + 4])
+                    if tag == ORIENTATION_TAG:
+                        orientation = struct.unpack(endian + 'H', tiff[entry + 8:entry + 10])[0]
+                        return orientation if 1 <= orientation <= 8 else 1
+            except struct.error:
+                return 1
+    return 1
+
+def apply_orientation(surface, orientation):
+    """Rotate and mirror a surface so an EXIF-oriented photo shows upright."""
+    if orientation == 2:
+        return pygame.transform.flip(surface, True, False)
+    if orientation == 3:
+        return pygame.transform.rotate(surface, 180)
+    if orientation == 4:
+        return pygame.transform.flip(surface, False, True)
+    if orientation == 5:
+        return pygame.transform.flip(pygame.transform.rotate(surface, 90), False, True)
+    if orientation == 6:
+        return pygame.transform.rotate(surface, -90)
+    if orientation == 7:
+        return pygame.transform.flip(pygame.transform.rotate(surface, 90), True, False)
+    if orientation == 8:
+        return pygame.transform.rotate(surface, 90)
+    return surface
+
+def decode_photo(photo_path, target_size, max_pixels):
+    """
+    Decode a photo no larger than needed for target_size, upright.
+
+    With Pillow installed, JPEGs are decoded directly at a reduced scale
+    (DCT scaling through Image.draft(), 1/2 to 1/8), so the decoded image
+    is at most about twice the target size in each dimension whatever the
+    camera resolution, and the result is resized to fit target_size before
+    it is copied into a pygame surface. Without Pillow the whole image is
+    decoded by pygame.
+
+    Args:
+        photo_path: path to the photo
+        target_size: (width, height) the photo will be scaled to fit
+        max_pixels: largest number of pixels that may be decoded at once
+
+    Returns:
+        pygame surface
+
+    Raises:
+        ValueError: the photo would need more than max_pixels to decode
+        OSError, pygame.error: the photo cannot be read or decoded
+    """
+    if Image is not None:
+        return decode_with_pillow(photo_path, target_size, max_pixels)
+
+    size = image_size(photo_path)
+    if size is not None and size[0] * size[1] > max_pixels:
+        raise ValueError(f"{size[0]}x{size[1]} photo exceeds the pixel budget of {max_pixels}")
+    photo = pygame.image.load(photo_path)
+    return apply_orientation(photo, exif_orientation(photo_path))
+
+def decode_with_pillow(photo_path, target_size, max_pixels):
+    try:
+        with Image.open(photo_path) as image:
+            orientation = image.getexif().get(ORIENTATION_TAG, 1)
+            draft_target = target_size
+            if orientation in TRANSPOSED_ORIENTATIONS:
+                draft_target = (target_size[1], target_size[0])
+            # Only changes anything for JPEG: picks the smallest DCT scale still at least this big
+            image.draft('RGB', fit_size(image.size, draft_target))
+
+            width, height = image.size
+            if width * height > max_pixels:
+                raise ValueError(f"{width}x{height} photo exceeds the pixel budget of {max_pixels}")
+
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+            size = fit_size(image.size, target_size)
+            if image.size != size:
+                image = image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+            logging.debug("Decoded %s at %dx%d for %dx%d", photo_path, width, height, size[0], size[1])
+            return pygame.image.fromstring(image.tobytes(), image.size, image.mode)
+    except Image.DecompressionBombError as e:
+        raise ValueError(str(e))
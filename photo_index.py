@@ -0,0 +1,288 @@
+import os
+import time
+import sqlite3
+import logging
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+SCHEMA_VERSION = 2
+# Directories modified this recently are listed again on the next refresh, since
+# another change within the same mtime tick would not move their mtime
+MTIME_GRACE_NS = 2 * 1000000000
+
+class PhotoIndex:
+    def __init__(self, root, index_file, extensions):
+        """
+        Persistent, incremental index of the photos under a directory tree.
+
+        The index remembers every directory's mtime and only lists the
+        directories whose mtime changed since the last refresh (adding,
+        removing or renaming an entry changes the mtime of the directory
+        holding it). Unchanged directories are descended into using the
+        subdirectories stored in the index, so a refresh of an unchanged
+        library costs one stat per directory.
+
+        Each photo also records the outcome of its validation (see
+        photo_validator): NULL status until checked, then 'ok' or 'bad'
+        with the reason. A photo whose size or mtime changed when its
+        directory is listed again is reported as removed and added, and
+        must be checked again.
+
+        If the optional inotify_simple package is installed, directories
+        are also watched, so local changes are noticed without waiting for
+        the next periodic refresh.
+
+        Args:
+            root: top-level photos directory
+            index_file: SQLite database file, or ':memory:' to keep the index in memory
+            extensions: lowercase file extensions to index, e.g. ('.jpg', '.png')
+        """
+        self.root = os.path.abspath(root)
+        self.index_file = index_file
+        self.extensions = tuple(extensions)
+        self.db = self.open_database()
+
+        # Directories reported by inotify that must be listed regardless of their mtime
+        self.changed_directories = set()
+        self.inotify = None
+        # watch descriptor -> directory
+        self.watches = {}
+        self.watched_directories = set()
+        if inotify_simple is not None:
+            try:
+                self.inotify = inotify_simple.INotify()
+            except OSError as e:
+                logging.warning(f"inotify unavailable, relying on periodic rescans: {e}")
+
+    def open_database(self):
+        try:
+            return self.connect()
+        except sqlite3.DatabaseError as e:
+            if self.index_file == ':memory:':
+                raise
+            logging.error(f"Photo index {self.index_file} is unreadable, rebuilding it: {e}")
+            os.remove(self.index_file)
+            return self.connect()
+
+    def connect(self):
+        # The prefetcher thread uses the index too; PhotoManager serializes access
+        db = sqlite3.connect(self.index_file, check_same_thread=False)
+        if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            db.executescript("""
+                DROP TABLE IF EXISTS directories;
+                DROP TABLE IF EXISTS photos;
+                CREATE TABLE directories (path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER);
+                CREATE TABLE photos (path TEXT PRIMARY KEY, directory TEXT NOT NULL, size INTEGER, mtime_ns INTEGER,
+                                     status TEXT, width INTEGER, height INTEGER, orientation INTEGER, error TEXT);
+                CREATE INDEX photos_directory ON photos (directory);
+            """)
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            db.commit()
+        db.execute("PRAGMA synchronous = NORMAL")
+        return db
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self.db.close()
+
+    def paths(self):
+        """Return every indexed photo path."""
+        return [row[0] for row in self.db.execute("SELECT path FROM photos")]
+
+    def validation_status(self, paths):
+        """
+        Return path -> True (good) or False (bad) for the given photos that were already validated.
+        """
+        paths = list(paths)
+        statuses = {}
+        # Stay below SQLite's limit on query parameters
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            statuses.update((path, status == 'ok') for path, status in self.db.execute(
+                f"SELECT path, status FROM photos WHERE status IS NOT NULL AND path IN ({','.join('?' * len(chunk))})",
+                chunk))
+        return statuses
+
+    def modified_times(self, paths):
+        """Return path -> modification time in seconds for the given photos, as of the last refresh."""
+        paths = list(paths)
+        times = {}
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            times.update((path, mtime_ns / 1e9) for path, mtime_ns in self.db.execute(
+                f"SELECT path, mtime_ns FROM photos WHERE mtime_ns IS NOT NULL AND path IN ({','.join('?' * len(chunk))})",
+                chunk))
+        return times
+
+    def record_validation(self, checks):
+        """Store the PhotoCheck results of photo_validator; photos removed meanwhile are ignored."""
+        self.db.executemany("UPDATE photos SET status = ?, width = ?, height = ?, orientation = ?, error = ? "
+                            "WHERE path = ?",
+                            (('ok' if check.ok else 'bad', check.width, check.height, check.orientation, check.error,
+                              check.path) for check in checks))
+        self.db.commit()
+
+    def has_changes(self):
+        """
+        Collect pending inotify events without blocking.
+
+        Returns:
+            bool: True if a watched directory changed since the last refresh
+        """
+        if self.inotify is None:
+            return False
+        for event in self.inotify.read(timeout=0):
+            directory = self.watches.get(event.wd)
+            if directory is None:
+                continue
+            if event.mask & inotify_simple.flags.IGNORED:
+                # The directory was deleted or unmounted
+                del self.watches[event.wd]
+                self.watched_directories.discard(directory)
+            self.changed_directories.add(directory)
+        return bool(self.changed_directories)
+
+    def refresh(self):
+        """
+        Bring the index up to date with the directory tree.
+
+        Returns:
+            tuple: (added, removed) lists of photo paths; changed photos are in both
+        """
+        start_time = time.time()
+        known = {path: (parent, mtime_ns) for path, parent, mtime_ns in
+                 self.db.execute("SELECT path, parent, mtime_ns FROM directories")}
+        subdirectories = {}
+        for path, (parent, _) in known.items():
+            subdirectories.setdefault(parent, []).append(path)
+
+        changed = self.changed_directories
+        self.changed_directories = set()
+        added = []
+        removed = []
+        changed_files = []
+        seen = set()
+        listed = 0
+        now_ns = time.time_ns()
+        stack = [self.root]
+        root_reachable = True
+
+        def keep(directory):
+            # Leave an unreadable directory's photos and subdirectories as they are
+            seen.add(directory)
+            stack.extend(subdirectories.get(directory, ()))
+
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError as e:
+                if directory == self.root:
+                    # e.g. the NAS is offline: do not mistake that for an empty library
+                    logging.error(f"Photos directory {directory} is unreachable, keeping the index as it is: {e}")
+                    root_reachable = False
+                elif not isinstance(e, FileNotFoundError):
+                    logging.error(f"Error reading photos directory {directory}: {e}")
+                    keep(directory)
+                # A deleted directory is not seen, so its photos are removed below
+                continue
+            seen.add(directory)
+
+            known_entry = known.get(directory)
+            if known_entry is not None and known_entry[1] == mtime_ns and directory not in changed:
+                stack.extend(subdirectories.get(directory, ()))
+                continue
+
+            listed += 1
+            try:
+                files, children = self.list_directory(directory)
+            except OSError as e:
+                logging.error(f"Error listing photos directory {directory}: {e}")
+                keep(directory)
+                # Forget its mtime, so it is listed again on the next refresh
+                self.db.execute("UPDATE directories SET mtime_ns = NULL WHERE path = ?", (directory,))
+                continue
+            indexed = {path: (size, file_mtime_ns) for path, size, file_mtime_ns in self.db.execute(
+                "SELECT path, size, mtime_ns FROM photos WHERE directory = ?", (directory,))}
+            new_files = files.keys() - indexed.keys()
+            gone_files = indexed.keys() - files.keys()
+            # Rewritten in place: the file must be validated again
+            modified_files = [path for path in files.keys() & indexed.keys() if files[path] != indexed[path]]
+            self.db.executemany("INSERT INTO photos (path, directory, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                                ((path, directory) + files[path] for path in new_files))
+            self.db.executemany("DELETE FROM photos WHERE path = ?", ((path,) for path in gone_files))
+            self.db.executemany("UPDATE photos SET size = ?, mtime_ns = ?, status = NULL WHERE path = ?",
+                                (files[path] + (path,) for path in modified_files))
+            added.extend(new_files)
+            removed.extend(gone_files)
+            changed_files.extend(modified_files)
+
+            stored_mtime_ns = mtime_ns if now_ns - mtime_ns > MTIME_GRACE_NS else None
+            parent = None if directory == self.root else os.path.dirname(directory)
+            self.db.execute("INSERT OR REPLACE INTO directories (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                            (directory, parent, stored_mtime_ns))
+            self.watch(directory)
+            stack.extend(children)
+
+        # Directories that were not reached any more have been deleted or moved away
+        for directory in (known.keys() - seen if root_reachable else ()):
+            removed.extend(row[0] for row in self.db.execute("SELECT path FROM photos WHERE directory = ?", (directory,)))
+            self.db.execute("DELETE FROM photos WHERE directory = ?", (directory,))
+            self.db.execute("DELETE FROM directories WHERE path = ?", (directory,))
+        self.db.commit()
+
+        logging.info(f"Photo index refreshed in {time.time() - start_time:.2f} seconds: "
+                     f"{len(seen)} directories, {listed} listed, {len(added)} photos added, {len(removed)} removed, "
+                     f"{len(changed_files)} changed")
+        return added + changed_files, removed + changed_files
+
+    def list_directory(self, directory):
+        """
+        List a single directory.
+
+        Returns:
+            tuple: (dict of photo path -> (size, mtime_ns), list of subdirectory paths)
+
+        Raises:
+            OSError: the directory cannot be listed
+        """
+        files = {}
+        children = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                # Skip hidden folders and NAS metadata such as Synology's @eaDir thumbnails
+                if entry.name.startswith(('.', '@')):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        children.append(entry.path)
+                    elif entry.name.lower().endswith(self.extensions) and entry.is_file():
+                        stat = entry.stat()
+                        files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    continue
+        return files, children
+
+    def watch(self, directory):
+        if self.inotify is None or directory in self.watched_directories:
+            return
+        flags = inotify_simple.flags
+        try:
+            # CLOSE_WRITE: a photo rewritten in place must be validated again
+            wd = self.inotify.add_watch(directory, flags.CREATE | flags.DELETE | flags.MOVED_FROM |
+                                        flags.MOVED_TO | flags.DELETE_SELF | flags.CLOSE_WRITE)
+        except OSError as e:
+            # Usually fs.inotify.max_user_watches; periodic rescans still find every change
+            logging.warning(f"Could not watch {directory}, disabling inotify: {e}")
+            self.inotify.close()
+            self.inotify = None
+            self.watches = {}
+            self.watched_directories = set()
+            return
+        self.watches[wd] = directory
+        self.watched_directories.add(directory)
@@ -1,75 +1,181 @@
-import os
-import random
 import logging
-import glob
+import time
+import threading
+from photo_source import LocalPhotoSource
+from photo_selector import PhotoSelector
 
 class PhotoManager:
     SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
 
-    def __init__(self, photos_directory='./photos'):
+    def __init__(self, photos_directory='./photos', index_file=None, selector=None, source=None, validator=None):
         """
-        Initialize PhotoManager to load photos from a local directory.
+        Initialize PhotoManager to load photos from a photo source, by default a local directory.
 
         Args:
-            photos_directory: Path to directory containing photos
+            photos_directory: Path to directory containing photos (searched recursively)
+            index_file: SQLite file persisting the photo index between runs, or None to keep it in memory
+            selector: PhotoSelector choosing the next photo, defaults to a plain shuffle
+            source: PhotoSource to use instead of photos_directory (e.g. an HttpPhotoSource)
+            validator: PhotoValidator checking new and changed photos before they can be selected;
+                photos that fail are quarantined (kept out of the selection until they change)
         """
-        self.photos_directory = os.path.abspath(photos_directory)
+        if source is None:
+            source = LocalPhotoSource(photos_directory, index_file, self.SUPPORTED_FORMATS)
+        self.source = source
+        # Local directory holding the photos (for a remote source, its cache)
+        self.photos_directory = source.root
         self.photo_list = []
+        # photo path -> position in photo_list, so removals are O(1)
+        self.photo_positions = {}
         self.rescan_interval = 300  # Rescan directory every 5 minutes
         self.last_scan_time = 0
-
-        logging.info(f"PhotoManager initialized with directory: {self.photos_directory}")
-
-        if not os.path.exists(self.photos_directory):
-            logging.warning(f"Photos directory does not exist: {self.photos_directory}")
-            logging.info(f"Creating directory: {self.photos_directory}")
+        self.selector = selector if selector is not None else PhotoSelector()
+        self.validator = validator
+        # Photos submitted to the validator and not checked yet
+        self.validating = set()
+        self.quarantined = set()
+        # Set whenever photos become selectable or the source has new ones, to wake a prefetcher waiting for them
+        self.photos_added = threading.Event()
+        source.notify = self.photos_added.set
+        # The prefetcher thread picks photos too
+        self.lock = threading.RLock()
+
+        logging.info(f"PhotoManager initialized with source: {source.description}")
+
+        # The source is read and refreshed on the first scan_photos() call, normally
+        # from the prefetcher thread, so startup does not wait for the photo library
+        self.index_loaded = False
+
+    def close(self):
+        # Outside the lock: validation callbacks may be waiting for it
+        if self.validator is not None:
+            self.validator.close()
+        with self.lock:
+            self.source.close()
+
+    def add_photos(self, paths):
+        if self.validator is not None:
+            paths = self.validated_photos(paths)
+        self.include_photos(paths)
+
+    def include_photos(self, paths):
+        """Make photos selectable."""
+        self.selector.add(paths)
+        for path in paths:
+            if path not in self.photo_positions:
+                self.photo_positions[path] = len(self.photo_list)
+                self.photo_list.append(path)
+        if paths:
+            self.photos_added.set()
+
+    def wait_for_photos(self, timeout):
+        """Wait up to timeout seconds for photos to become selectable, e.g. once validated or downloaded."""
+        with self.lock:
+            if self.photo_list:
+                return
+            self.photos_added.clear()
+            if self.source.has_changes():
+                return
+        self.photos_added.wait(timeout)
+
+    def validated_photos(self, paths):
+        """Return the photos known to be good, and submit the unchecked ones to the validator."""
+        statuses = self.source.validation_status(paths)
+        unchecked = [path for path in paths if path not in statuses and path not in self.validating]
+        if unchecked:
+            self.validating.update(unchecked)
+            self.validator.submit(unchecked, self.photos_validated)
+            logging.info(f"Validating {len(unchecked)} new or changed photos")
+        self.quarantined.update(path for path, ok in statuses.items() if not ok)
+        return [path for path, ok in statuses.items() if ok]
+
+    def photos_validated(self, checks):
+        """Validator callback: make good photos selectable and quarantine bad ones."""
+        with self.lock:
             try:
-                os.makedirs(self.photos_directory)
+                self.source.record_validation(checks)
             except Exception as e:
-                logging.error(f"Failed to create photos directory: {e}")
-
-        self.scan_photos()
+                # Raising here would stop the pool from delivering results
+                logging.error(f"Error recording photo validation: {e}")
+            good = []
+            for check in checks:
+                if check.path not in self.validating:
+                    # Removed while it was being checked
+                    continue
+                self.validating.discard(check.path)
+                if check.ok:
+                    good.append(check.path)
+                else:
+                    self.quarantined.add(check.path)
+                    logging.warning(f"Quarantined photo {check.path}: {check.error}")
+            self.include_photos(good)
+            if not self.validating:
+                logging.info(f"Photo validation done: {len(self.photo_list)} photos, "
+                             f"{len(self.quarantined)} quarantined")
+
+    def remove_photos(self, paths):
+        self.validating.difference_update(paths)
+        self.quarantined.difference_update(paths)
+        self.selector.remove(paths)
+        for path in paths:
+            position = self.photo_positions.pop(path, None)
+            if position is None:
+                continue
+            # Move the last photo into the hole instead of shifting the list
+            last = self.photo_list.pop()
+            if position < len(self.photo_list):
+                self.photo_list[position] = last
+                self.photo_positions[last] = position
 
     def scan_photos(self):
-        """Scan the photos directory and build a list of image files."""
-        import time
-        current_time = time.time()
-
-        # Only rescan if enough time has passed
-        if self.photo_list and (current_time - self.last_scan_time < self.rescan_interval):
-            return
+        """
+        Bring the photo list up to date with the photo source.
 
-        logging.info(f"Scanning photos directory: {self.photos_directory}")
-        self.photo_list = []
+        Runs every rescan_interval, or sooner when the source reports a change
+        (e.g. inotify on a local directory).
+        """
+        current_time = time.time()
 
-        try:
-            for ext in self.SUPPORTED_FORMATS:
-                # Search for files with this extension (case-insensitive)
-                pattern = os.path.join(self.photos_directory, f'*{ext}')
-                self.photo_list.extend(glob.glob(pattern))
-                # Also check uppercase extensions
-                pattern_upper = os.path.join(self.photos_directory, f'*{ext.upper()}')
-                self.photo_list.extend(glob.glob(pattern_upper))
-
-            # Remove duplicates and sort
-            self.photo_list = sorted(list(set(self.photo_list)))
-
-            logging.info(f"Found {len(self.photo_list)} photos in directory")
-            if len(self.photo_list) == 0:
-                logging.warning(f"No photos found in {self.photos_directory}")
+        with self.lock:
+            if not self.index_loaded:
+                self.index_loaded = True
+                self.add_photos(self.source.paths())
+                logging.info(f"Loaded {len(self.photo_list)} known photos from {self.source.description}"
+                             + (f" ({len(self.quarantined)} quarantined)" if self.quarantined else ""))
+                if self.photo_list:
+                    # Pick the first photo from the persisted index or cache; the next call
+                    # (last_scan_time is still 0) lists the directories that changed
+                    return
+
+            # Only rescan if enough time has passed or a watched directory changed
+            if ((self.photo_list or self.validating) and current_time - self.last_scan_time < self.rescan_interval
+                    and not self.source.has_changes()):
+                return
+
+            logging.info(f"Scanning photos from: {self.source.description}")
+            try:
+                added, removed = self.source.refresh()
+            except Exception as e:
+                logging.error(f"Error scanning photos from {self.source.description}: {e}")
+                return
+            finally:
+                self.last_scan_time = current_time
+
+            self.remove_photos(removed)
+            self.add_photos(added)
+
+            logging.info(f"Found {len(self.photo_list)} photos")
+            if self.validating:
+                logging.info(f"{len(self.validating)} photos waiting for validation")
+            elif len(self.photo_list) == 0:
+                logging.warning(f"No photos found in {self.source.description}")
                 logging.warning(f"Please add image files ({', '.join(self.SUPPORTED_FORMATS)}) to this directory")
             else:
                 logging.debug(f"Sample photos: {self.photo_list[:3]}")
 
-            self.last_scan_time = current_time
-
-        except Exception as e:
-            logging.error(f"Error scanning photos directory: {e}")
-            self.photo_list = []
-
     def get_random_photo(self):
         """
-        Get a random photo from the photos directory.
+        Get the next photo chosen by the selector.
 
         Returns:
             str: Full path to a random photo file, or None if no photos available
@@ -77,11 +183,11 @@ class PhotoManager:
         # Rescan directory periodically (in case new photos were added)
         self.scan_photos()
 
-        if not self.photo_list:
-            logging.warning("No photos available to display")
-            return None
+        with self.lock:
+            if not self.photo_list:
+                logging.warning("No photos available to display")
+                return None
 
-        # Return a random photo
-        photo_path = random.choice(self.photo_list)
-        logging.debug(f"Selected photo: {photo_path}")
+            photo_path = self.selector.pick()
+        logging.debug("Selected photo: %s", photo_path)
         return photo_path
@@ -0,0 +1,83 @@
+import pygame
+import queue
+import threading
+import logging
+
+# Posted to the pygame event queue whenever a new photo is ready, so an idle main loop wakes up
+PHOTO_READY = pygame.event.custom_type()
+
+class PhotoPrefetcher:
+    def __init__(self, photo_manager, load_photo, prefetch_count=2, retry_interval=10):
+        """
+        Decode and scale upcoming photos on a background thread.
+
+        Args:
+            photo_manager: PhotoManager used to pick the next photos
+            load_photo: callable taking a path and returning a scaled surface, or None on failure
+            prefetch_count: number of ready photos to keep ahead of the slideshow
+            retry_interval: seconds to wait before retrying when no photos are available
+        """
+        self.photo_manager = photo_manager
+        self.load_photo = load_photo
+        self.prefetch_count = max(1, prefetch_count)
+        self.retry_interval = retry_interval
+        self.ready_photos = queue.Queue(maxsize=self.prefetch_count)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="PhotoPrefetcher", daemon=True)
+
+    def start(self):
+        logging.info(f"Starting photo prefetcher ({self.prefetch_count} photos ahead)")
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        # Wake run() if it is waiting for photos
+        self.photo_manager.photos_added.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=5)
+
+    def get_photo(self):
+        """
+        Take the next ready photo without blocking.
+
+        Returns:
+            tuple: (photo_path, surface), or None if nothing is ready yet
+        """
+        try:
+            return self.ready_photos.get_nowait()
+        except queue.Empty:
+            return None
+
+    def run(self):
+        while not self.stopped.is_set():
+            photo_path = self.photo_manager.get_random_photo()
+            if not photo_path:
+                self.photo_manager.wait_for_photos(self.retry_interval)
+                continue
+
+            try:
+                photo = self.load_photo(photo_path)
+            except Exception as e:
+                logging.error(f"Error prefetching photo {photo_path}: {e}")
+                photo = None
+            if photo is None:
+                # Skip it here so the render loop never retries a bad file
+                logging.warning(f"Skipping photo that failed to load: {photo_path}")
+                self.stopped.wait(1)
+                continue
+
+            # Block until the slideshow has room for another photo
+            while not self.stopped.is_set():
+                try:
+                    self.ready_photos.put((photo_path, photo), timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                return
+
+            logging.debug("Prefetched photo: %s", photo_path)
+            try:
+                pygame.event.post(pygame.event.Event(PHOTO_READY))
+            except pygame.error as e:
+                logging.debug("Could not post photo ready event: %s", e)
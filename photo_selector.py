@@ -0,0 +1,202 @@
+import os
+import time
+import random
+import logging
+
+class TicketList:
+    def __init__(self):
+        """
+        List of photo tickets with O(1) random removal.
+
+        A photo with weight w holds w tickets. Removing a ticket moves the
+        last ticket into its slot instead of shifting the list.
+        """
+        self.tickets = []
+        # photo path -> indices of its tickets
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.tickets)
+
+    def __contains__(self, path):
+        return path in self.positions
+
+    def add(self, path, count=1):
+        indices = self.positions.setdefault(path, [])
+        for _ in range(count):
+            indices.append(len(self.tickets))
+            self.tickets.append(path)
+
+    def remove_at(self, index):
+        """Remove the ticket at an index and return its photo path."""
+        path = self.tickets[index]
+        indices = self.positions[path]
+        indices.remove(index)
+        if not indices:
+            del self.positions[path]
+
+        last_index = len(self.tickets) - 1
+        last = self.tickets.pop()
+        if index != last_index:
+            self.tickets[index] = last
+            last_indices = self.positions[last]
+            last_indices[last_indices.index(last_index)] = index
+        return path
+
+    def add_all(self, other):
+        """Add every ticket of another TicketList, in one O(n) pass."""
+        offset = len(self.tickets)
+        self.tickets.extend(other.tickets)
+        for path, indices in other.positions.items():
+            self.positions.setdefault(path, []).extend(index + offset for index in indices)
+
+    def remove(self, path):
+        """Remove every ticket of a photo."""
+        while path in self.positions:
+            self.remove_at(self.positions[path][-1])
+
+    def clear(self):
+        self.tickets = []
+        self.positions = {}
+
+class PhotoWeights:
+    def __init__(self, source, favorite_folder='', favorite_weight=3, new_photo_days=0, new_photo_weight=2):
+        """
+        Integer selection weight of photos (how many tickets each gets).
+
+        Modification times come from the photo source (the photo index, or
+        the download time of a remote photo), so weighing does not stat
+        every file.
+
+        Args:
+            source: PhotoSource the photos come from
+            favorite_folder: photos inside a folder with this name (at any depth) are favorites, '' for none
+            favorite_weight: weight of favorite photos
+            new_photo_days: photos modified within this many days count as new, 0 to disable
+            new_photo_weight: weight of new photos
+        """
+        self.source = source
+        self.photos_directory = os.path.abspath(source.root)
+        self.favorite_folder = favorite_folder.lower()
+        self.favorite_weight = max(1, favorite_weight)
+        self.new_photo_days = new_photo_days
+        self.new_photo_weight = max(1, new_photo_weight)
+
+    def enabled(self):
+        return bool(self.favorite_folder) or self.new_photo_days > 0
+
+    def __call__(self, paths):
+        """Return path -> weight for a list of photos."""
+        modified_times = self.source.modified_times(paths) if self.new_photo_days > 0 else {}
+        new_after = time.time() - self.new_photo_days * 86400
+        weights = {}
+        for path in paths:
+            weight = 1
+            if self.favorite_folder:
+                folders = os.path.relpath(os.path.dirname(path), self.photos_directory).lower().split(os.sep)
+                if self.favorite_folder in folders:
+                    weight = max(weight, self.favorite_weight)
+            modified = modified_times.get(path)
+            if modified is not None and modified > new_after:
+                weight = max(weight, self.new_photo_weight)
+            weights[path] = weight
+        return weights
+
+class PhotoSelector:
+    MODES = ('random', 'shuffle')
+    # Draws tried before accepting a photo that was shown recently
+    MAX_REDRAWS = 16
+
+    def __init__(self, mode='shuffle', recent_window=0, weight=None):
+        """
+        Choose which photo to show next.
+
+        In 'shuffle' mode every photo is drawn from a bag that holds each
+        photo's tickets once per cycle, so every photo is shown before any
+        repeats; the bag is refilled when it runs empty. In 'random' mode
+        every pick is independent, as random.choice() used to be. Photos
+        added or removed mid-cycle are put into or taken out of the bag
+        without reshuffling, and each pick is O(1) amortized. Weights are
+        computed again once per cycle (in 'random' mode, every len(self)
+        picks), so a photo stops counting as new without a restart.
+
+        Args:
+            mode: 'shuffle' or 'random'
+            recent_window: number of previous picks a photo is kept out of, when possible
+            weight: callable returning path -> integer weight for a list of photos, or None for equal weights
+        """
+        if mode not in self.MODES:
+            logging.warning(f"Unknown photo selection mode '{mode}', using shuffle")
+            mode = 'shuffle'
+        self.mode = mode
+        self.recent_window = max(0, recent_window)
+        self.weight = weight
+        self.pool = TicketList()
+        self.bag = TicketList()
+        # photo path -> sequence number of its latest pick
+        self.last_picked = {}
+        self.pick_count = 0
+        # pick_count when the weights were last computed
+        self.weighed_at = 0
+
+    def __len__(self):
+        return len(self.pool.positions)
+
+    def add(self, paths):
+        paths = [path for path in dict.fromkeys(paths) if path not in self.pool]
+        weights = self.weight(paths) if self.weight and paths else {}
+        for path in paths:
+            count = weights.get(path, 1)
+            self.pool.add(path, count)
+            if self.mode == 'shuffle':
+                # New photos join the current cycle
+                self.bag.add(path, count)
+
+    def remove(self, paths):
+        for path in paths:
+            if path not in self.pool:
+                continue
+            self.pool.remove(path)
+            self.bag.remove(path)
+            self.last_picked.pop(path, None)
+
+    def reweigh(self):
+        """Compute the weight of every photo again, and rebuild the pool from them."""
+        paths = list(self.pool.positions)
+        weights = self.weight(paths)
+        self.pool.clear()
+        for path in paths:
+            self.pool.add(path, weights.get(path, 1))
+        self.weighed_at = self.pick_count
+
+    def pick(self):
+        """Return the next photo path, or None if there are no photos."""
+        if not self.pool:
+            return None
+
+        if self.mode == 'shuffle':
+            if not self.bag:
+                logging.debug(f"Starting a new shuffle cycle of {len(self)} photos")
+                if self.weight and self.pick_count:
+                    self.reweigh()
+                self.bag.add_all(self.pool)
+            tickets = self.bag
+        else:
+            if self.weight and self.pick_count - self.weighed_at >= len(self):
+                self.reweigh()
+            tickets = self.pool
+
+        # Never ask for more distinct recent photos than exist
+        window = min(self.recent_window, len(self) - 1)
+        for _ in range(self.MAX_REDRAWS):
+            index = random.randrange(len(tickets))
+            path = tickets.tickets[index]
+            last = self.last_picked.get(path)
+            if last is None or self.pick_count - last >= window:
+                break
+
+        if tickets is self.bag:
+            self.bag.remove_at(index)
+        self.pick_count += 1
+        self.last_picked[path] = self.pick_count
+        return path
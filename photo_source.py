@@ -0,0 +1,103 @@
+import os
+import logging
+from photo_index import PhotoIndex
+
+class PhotoSource:
+    """
+    Where PhotoManager gets its photos from.
+
+    A source makes photos available as local files under root and reports
+    which appeared or disappeared since the last refresh:
+
+        paths()        photo paths known at startup (e.g. from a persisted index or cache)
+        refresh()      bring the photos up to date, returning (added paths, removed paths)
+        has_changes()  True if a refresh before the periodic one is worthwhile
+        close()        release files, connections and threads
+
+    and keeps the results of photo_validator, so photos are only checked
+    once (a changed photo is reported by refresh() as removed and added,
+    and forgets its result):
+
+        validation_status(paths)  path -> True (good) / False (bad) for the photos already checked
+        record_validation(checks) store a list of PhotoCheck
+
+    modified_times(paths) returns path -> modification time in seconds,
+    for the weight given to new photos (by default it stats the files).
+
+    A source whose changes arrive on its own threads calls notify(), set
+    by PhotoManager, when has_changes() becomes True.
+    """
+    root = None
+    description = None
+    notify = None
+
+    def paths(self):
+        return []
+
+    def refresh(self):
+        raise NotImplementedError
+
+    def has_changes(self):
+        return False
+
+    def validation_status(self, paths):
+        return {}
+
+    def record_validation(self, checks):
+        pass
+
+    def modified_times(self, paths):
+        times = {}
+        for path in paths:
+            try:
+                times[path] = os.stat(path).st_mtime
+            except OSError:
+                pass
+        return times
+
+    def close(self):
+        pass
+
+class LocalPhotoSource(PhotoSource):
+    def __init__(self, photos_directory, index_file, extensions):
+        """
+        Photos in a local directory tree, kept in an incremental PhotoIndex.
+
+        Args:
+            photos_directory: directory containing photos (searched recursively), created if missing
+            index_file: SQLite file persisting the photo index between runs, or None to keep it in memory
+            extensions: lowercase file extensions of photos
+        """
+        self.root = os.path.abspath(photos_directory)
+        self.description = self.root
+
+        if not os.path.exists(self.root):
+            logging.warning(f"Photos directory does not exist: {self.root}")
+            logging.info(f"Creating directory: {self.root}")
+            try:
+                os.makedirs(self.root)
+            except Exception as e:
+                logging.error(f"Failed to create photos directory: {e}")
+
+        self.photo_index = PhotoIndex(self.root, index_file or ':memory:', extensions)
+
+    def paths(self):
+        return self.photo_index.paths()
+
+    def refresh(self):
+        return self.photo_index.refresh()
+
+    def has_changes(self):
+        return self.photo_index.has_changes()
+
+    def validation_status(self, paths):
+        return self.photo_index.validation_status(paths)
+
+    def record_validation(self, checks):
+        self.photo_index.record_validation(checks)
+
+    def modified_times(self, paths):
+        return self.photo_index.modified_times(paths)
+
+    def close(self):
+        self.photo_index.close()
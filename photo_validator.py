@@ -0,0 +1,148 @@
+import os
+import signal
+import logging
+import logging.handlers
+import collections
+import multiprocessing
+from photo_decoder import decode_photo, image_size, exif_orientation
+
+# Result of checking one photo; width, height and orientation are None when they could not be read
+PhotoCheck = collections.namedtuple('PhotoCheck', ('path', 'ok', 'width', 'height', 'orientation', 'error'))
+
+def skip_sub_blocks(f):
+    while True:
+        length = f.read(1)
+        if not length or length[0] == 0:
+            return
+        f.seek(length[0], 1)
+
+def is_animated_gif(path):
+    """Return True if a file is a GIF holding more than one image, reading only its block headers."""
+    with open(path, 'rb') as f:
+        header = f.read(13)
+        if header[:6] not in (b'GIF87a', b'GIF89a') or len(header) < 13:
+            return False
+        if header[10] & 0x80:
+            # Global color table
+            f.seek(3 * 2 ** ((header[10] & 7) + 1), 1)
+        images = 0
+        while True:
+            block = f.read(1)
+            if block == b',':
+                descriptor = f.read(9)
+                if len(descriptor) < 9:
+                    return False
+                if descriptor[8] & 0x80:
+                    # Local color table
+                    f.seek(3 * 2 ** ((descriptor[8] & 7) + 1), 1)
+                f.read(1)  # LZW minimum code size
+                skip_sub_blocks(f)
+                images += 1
+                if images > 1:
+                    return True
+            elif block == b'!':
+                f.read(1)  # Extension label
+                skip_sub_blocks(f)
+            else:
+                # Trailer, or the end of a truncated file
+                return False
+
+def check_photo(path, target_size, max_pixels):
+    """
+    Check that a photo can be shown: header, dimensions and a full decode.
+
+    The decode is the one the slideshow makes (decode_photo() at the
+    screen size, within the pixel budget), so a photo that passes is
+    known to load.
+    """
+    width = height = orientation = None
+    try:
+        size = image_size(path)
+        if size is None:
+            raise ValueError("not a JPEG, PNG, GIF or BMP image")
+        width, height = size
+        if width <= 0 or height <= 0:
+            raise ValueError(f"invalid size {width}x{height}")
+        if is_animated_gif(path):
+            raise ValueError("animated GIFs are not supported")
+        orientation = exif_orientation(path)
+        decode_photo(path, target_size, max_pixels)
+    # Anything a decoder raises on a broken file (Pillow raises SyntaxError for some) makes the photo bad
+    except Exception as e:
+        return PhotoCheck(path, False, width, height, orientation, str(e) or type(e).__name__)
+    return PhotoCheck(path, True, width, height, orientation, None)
+
+class ForwardHandler(logging.Handler):
+    """Hands records received from the workers to the logger they were made for, in this process."""
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+def init_worker(log_queue, log_level):
+    # The handlers inherited from the clock feed a queue whose writer thread does not exist after the
+    # fork; send records back to the clock through log_queue instead
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(log_level)
+    # Ctrl+C is handled by the clock, which terminates the pool; validating is less urgent than drawing
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        os.nice(10)
+    except OSError:
+        pass
+
+def check_photos(paths, target_size, max_pixels):
+    return [check_photo(path, target_size, max_pixels) for path in paths]
+
+class PhotoValidator:
+    def __init__(self, target_size, max_pixels, jobs=None, batch_size=16):
+        """
+        Check new and changed photos in a pool of background processes.
+
+        The pool is forked when the validator is created, so create it
+        before opening the display and before starting any thread (such
+        as the prefetcher's). Workers run at a lower priority than the
+        clock, and their log records are written by this process.
+
+        Args:
+            target_size: (width, height) photos are decoded for (the screen)
+            max_pixels: pixel budget of a decode, as used by the slideshow
+            jobs: number of worker processes, default one less than the CPU cores (at least one)
+            batch_size: photos checked per task
+        """
+        self.target_size = tuple(target_size)
+        self.max_pixels = max_pixels
+        self.batch_size = batch_size
+        self.jobs = jobs or max(1, (os.cpu_count() or 1) - 1)
+        # Fork, so workers inherit the imported modules without re-running the clock's startup code
+        context = multiprocessing.get_context('fork')
+        self.log_queue = context.Queue()
+        self.pool = context.Pool(self.jobs, init_worker, (self.log_queue, logging.getLogger().level))
+        # Started after the fork, so the workers do not inherit a copy of its thread
+        self.log_listener = logging.handlers.QueueListener(self.log_queue, ForwardHandler())
+        self.log_listener.start()
+        logging.info(f"Photo validator started with {self.jobs} processes")
+
+    def submit(self, paths, callback):
+        """
+        Queue photos for checking.
+
+        callback is called with a list of PhotoCheck for each batch, on a
+        thread of the pool, as batches complete.
+        """
+        paths = list(paths)
+        for start in range(0, len(paths), self.batch_size):
+            self.pool.apply_async(check_photos, (paths[start:start + self.batch_size], self.target_size,
+                                                 self.max_pixels),
+                                  callback=callback, error_callback=self.log_error)
+
+    @staticmethod
+    def log_error(error):
+        logging.error(f"Photo validation failed: {error}")
+
+    def close(self):
+        # Pending checks are dropped; unchecked photos are checked again on the next run
+        self.pool.terminate()
+        self.pool.join()
+        self.log_listener.stop()
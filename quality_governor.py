@@ -0,0 +1,117 @@
+import time
+import logging
+import collections
+
+# One step of drawing quality: animation frame rate, smoothscale (or the plain, faster scaler)
+# for photos, and outlined text (or plain text without border and shadow)
+QualityTier = collections.namedtuple('QualityTier', ('fps', 'smooth_scaling', 'text_outline'))
+
+DEFAULT_TIERS = "30 smooth outline, 20 smooth outline, 15 fast outline, 10 fast plain"
+
+def parse_tiers(value):
+    """
+    Parse the [Quality] tiers option: comma-separated tiers, best first.
+
+    Each tier is a frame rate followed by 'smooth' or 'fast' photo scaling
+    and 'outline' or 'plain' text, e.g. "30 smooth outline, 15 fast plain";
+    omitted words default to smooth and outline.
+
+    Returns:
+        list of QualityTier
+    """
+    tiers = []
+    for spec in value.split(','):
+        words = spec.split()
+        if not words:
+            continue
+        fps = None
+        smooth_scaling = True
+        text_outline = True
+        for word in words:
+            if word.isdigit() and int(word) > 0:
+                fps = int(word)
+            elif word in ('smooth', 'fast'):
+                smooth_scaling = word == 'smooth'
+            elif word in ('outline', 'plain'):
+                text_outline = word == 'outline'
+            else:
+                raise ValueError(f"Unknown quality setting '{word}' in tier '{spec.strip()}'")
+        if fps is None:
+            raise ValueError(f"Quality tier '{spec.strip()}' has no frame rate")
+        tiers.append(QualityTier(fps, smooth_scaling, text_outline))
+    if not tiers:
+        raise ValueError("No quality tiers given")
+    return tiers
+
+def describe_tier(tier):
+    return (f"{tier.fps} fps, {'smooth' if tier.smooth_scaling else 'fast'} scaling, "
+            f"{'outlined' if tier.text_outline else 'plain'} text")
+
+class QualityGovernor:
+    def __init__(self, tiers, adaptive=True, window=60, headroom=0.6, cooldown=60):
+        """
+        Choose the quality tier the device can draw within its frame budget.
+
+        The main loop reports the work time (not counting the sleep) of
+        every animated frame. Each time `window` frames have been seen, the
+        90th percentile of their work time is compared with the budget of
+        the current tier, one frame at its frame rate: over budget, the
+        governor steps down to the next cheaper tier; under `headroom`
+        times the budget of the next better tier, it steps back up. Stepping
+        up waits `cooldown` seconds after any change, so the tier does not
+        flip back and forth between two that are both borderline.
+
+        Args:
+            tiers: list of QualityTier, best first
+            adaptive: False keeps the first tier whatever the frame times
+            window: number of animated frames per decision
+            headroom: fraction of the better tier's budget frames must stay under to step up
+            cooldown: seconds after a change before stepping up
+        """
+        self.tiers = list(tiers)
+        self.adaptive = adaptive
+        self.window = window
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.level = 0
+        self.samples = []
+        self.last_change = time.monotonic()
+
+    @property
+    def tier(self):
+        return self.tiers[self.level]
+
+    def observe(self, seconds):
+        """
+        Record the work time of an animated frame.
+
+        Returns:
+            bool: True if the tier changed, and must be applied
+        """
+        if not self.adaptive or len(self.tiers) == 1:
+            return False
+        self.samples.append(seconds)
+        if len(self.samples) < self.window:
+            return False
+        self.samples.sort()
+        frame_time = self.samples[int(len(self.samples) * 0.9)]
+        self.samples = []
+
+        now = time.monotonic()
+        budget = 1 / self.tier.fps
+        if frame_time > budget and self.level < len(self.tiers) - 1:
+            self.change_level(self.level + 1, now, f"frame time {frame_time * 1000:.1f} ms over "
+                                                   f"{budget * 1000:.1f} ms budget")
+            return True
+        if (self.level > 0 and now - self.last_change >= self.cooldown
+                and frame_time < self.headroom / self.tiers[self.level - 1].fps):
+            self.change_level(self.level - 1, now, f"frame time {frame_time * 1000:.1f} ms leaves headroom")
+            return True
+        return False
+
+    def change_level(self, level, now, reason):
+        direction = "down" if level > self.level else "up"
+        self.level = level
+        self.last_change = now
+        logging.info(f"Quality stepped {direction} to tier {level + 1}/{len(self.tiers)} "
+                     f"({describe_tier(self.tier)}): {reason}")
@@ -0,0 +1,204 @@
+import pygame
+import os
+import mmap
+import struct
+import hashlib
+import tempfile
+import threading
+import logging
+import time
+
+# File header: magic, format version, width, height
+HEADER = struct.Struct('<4sHII')
+MAGIC = b'HWRC'
+VERSION = 1
+SUFFIX = '.rgb'
+
+class RenditionCache:
+    def __init__(self, cache_directory, max_bytes=512 * 1024 * 1024):
+        """
+        Persistent on-disk cache of photos already scaled to the screen.
+
+        Each rendition is stored as raw RGB pixels behind a small header and
+        keyed by the original's path, mtime, file size and target
+        resolution, so an edited or replaced photo is never served stale.
+        Hits are memory-mapped and wrapped as surfaces without any decode
+        step. The least recently used renditions are deleted once the cache
+        grows past max_bytes. The cache directory is scanned on first use,
+        normally from the prefetcher thread, so startup does not wait for
+        a stat of every rendition.
+
+        Args:
+            cache_directory: directory holding the cached renditions
+            max_bytes: upper bound for the total size of the cache
+        """
+        self.cache_directory = os.path.abspath(cache_directory)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # file name -> (size in bytes, last use time)
+        self.entries = {}
+        self.total_bytes = 0
+        self.scanned = False
+
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+        except OSError as e:
+            logging.error(f"Failed to create rendition cache directory: {e}")
+
+    def load(self):
+        """Scan the cache directory, the first time the cache is used."""
+        with self.lock:
+            if self.scanned:
+                return
+            self.scanned = True
+            self.scan()
+            logging.info(f"Rendition cache at {self.cache_directory}: {len(self.entries)} renditions, "
+                         f"{self.total_bytes // (1024 * 1024)} MB of {self.max_bytes // (1024 * 1024)} MB")
+
+    def scan(self):
+        """Rebuild the in-memory index from the files already on disk."""
+        self.entries = {}
+        self.total_bytes = 0
+        try:
+            with os.scandir(self.cache_directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.tmp'):
+                        # Left behind by a write that was interrupted
+                        self.unlink(entry.name)
+                        continue
+                    if not entry.name.endswith(SUFFIX) or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    self.entries[entry.name] = (stat.st_size, stat.st_mtime)
+                    self.total_bytes += stat.st_size
+        except OSError as e:
+            logging.error(f"Error scanning rendition cache: {e}")
+
+    def key(self, photo_path, size):
+        """
+        Return the cache file name for a photo scaled to fit size, or None if
+        the photo cannot be stat'ed.
+        """
+        try:
+            stat = os.stat(photo_path)
+        except OSError:
+            return None
+        identity = f"{os.path.abspath(photo_path)}\0{stat.st_mtime_ns}\0{stat.st_size}\0{size[0]}x{size[1]}"
+        return hashlib.sha1(identity.encode('utf-8', 'surrogateescape')).hexdigest() + SUFFIX
+
+    def get(self, photo_path, size):
+        """
+        Look up the rendition of a photo for a target resolution.
+
+        Args:
+            photo_path: path to the original photo
+            size: (width, height) the photo was scaled to fit
+
+        Returns:
+            pygame surface backed by the memory-mapped file, or None on a miss
+        """
+        self.load()
+        name = self.key(photo_path, size)
+        if name is None:
+            return None
+        with self.lock:
+            if name not in self.entries:
+                return None
+
+        path = os.path.join(self.cache_directory, name)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, width, height = HEADER.unpack_from(mapped)
+            if magic != MAGIC or version != VERSION or len(mapped) != HEADER.size + width * height * 3:
+                raise ValueError("bad header")
+            # The surface keeps the mapping alive for as long as it is used
+            surface = pygame.image.frombuffer(memoryview(mapped)[HEADER.size:], (width, height), 'RGB')
+        except (OSError, ValueError, struct.error, pygame.error) as e:
+            logging.warning(f"Discarding unreadable rendition {name} for {photo_path}: {e}")
+            self.remove(name)
+            return None
+
+        with self.lock:
+            if name in self.entries:
+                self.entries[name] = (self.entries[name][0], time.time())
+        # Record the use on disk too, so the LRU order survives a restart
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        logging.debug("Rendition cache hit for %s", photo_path)
+        return surface
+
+    def put(self, photo_path, size, surface):
+        """
+        Store the rendition of a photo for a target resolution.
+
+        Args:
+            photo_path: path to the original photo
+            size: (width, height) the photo was scaled to fit
+            surface: the scaled pygame surface
+        """
+        self.load()
+        name = self.key(photo_path, size)
+        if name is None:
+            return
+        width, height = surface.get_size()
+        data = HEADER.pack(MAGIC, VERSION, width, height) + pygame.image.tostring(surface, 'RGB')
+        if len(data) > self.max_bytes:
+            return
+
+        # Write to a temporary file first so readers never see a partial rendition
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, os.path.join(self.cache_directory, name))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logging.error(f"Error writing rendition for {photo_path}: {e}")
+            return
+
+        with self.lock:
+            previous = self.entries.get(name)
+            if previous is not None:
+                self.total_bytes -= previous[0]
+            self.entries[name] = (len(data), time.time())
+            self.total_bytes += len(data)
+            evicted = self.evict()
+        for evicted_name in evicted:
+            self.unlink(evicted_name)
+        logging.debug("Cached rendition of %s (%d bytes)", photo_path, len(data))
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits; returns the file names to delete."""
+        evicted = []
+        if self.total_bytes <= self.max_bytes:
+            return evicted
+        for name, (size, _) in sorted(self.entries.items(), key=lambda item: item[1][1]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            del self.entries[name]
+            self.total_bytes -= size
+            evicted.append(name)
+        logging.info(f"Evicted {len(evicted)} renditions from the cache")
+        return evicted
+
+    def remove(self, name):
+        with self.lock:
+            entry = self.entries.pop(name, None)
+            if entry is not None:
+                self.total_bytes -= entry[0]
+        self.unlink(name)
+
+    def unlink(self, name):
+        # Surfaces still mapping the file stay valid after it is deleted
+        try:
+            os.unlink(os.path.join(self.cache_directory, name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Error deleting rendition {name}: {e}")
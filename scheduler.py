@@ -0,0 +1,59 @@
+import pygame
+import datetime
+import logging
+
+class Scheduler:
+    def __init__(self, fps=30, max_sleep=60):
+        """
+        Decide how long the main loop may sleep between frames.
+
+        While something is animating the loop runs at the full frame rate.
+        Otherwise it blocks on pygame events until the next wall-clock
+        minute boundary (when the text changes) or the next registered
+        deadline, whichever comes first.
+
+        Args:
+            fps: frame rate used while animating
+            max_sleep: upper bound in seconds for a single idle wait
+        """
+        self.fps = fps
+        self.max_sleep = max_sleep
+        self.clock = pygame.time.Clock()
+
+    def seconds_until_next_minute(self):
+        """Return the number of seconds until the next minute boundary."""
+        now = datetime.datetime.now()
+        # Wake slightly after the boundary so the new minute is already visible
+        return 60 - now.second - now.microsecond / 1000000 + 0.01
+
+    def wait(self, animating=False, next_deadline=None):
+        """
+        Wait for the next frame and return the pending pygame events.
+
+        Args:
+            animating: True while a transition is running
+            next_deadline: seconds until another component needs a frame, or None
+
+        Returns:
+            list of pygame events
+        """
+        if animating:
+            self.clock.tick(self.fps)
+            return pygame.event.get()
+
+        timeout = min(self.seconds_until_next_minute(), self.max_sleep)
+        if next_deadline is not None:
+            timeout = min(timeout, next_deadline)
+        # Never spin faster than the frame rate (e.g. while a photo keeps failing to load)
+        timeout = max(timeout, 1 / self.fps)
+
+        logging.debug("Sleeping for up to %.2f seconds", timeout)
+        events = []
+        event = pygame.event.wait(int(timeout * 1000))
+        if event.type != pygame.NOEVENT:
+            events.append(event)
+        events.extend(pygame.event.get())
+
+        # Keep the clock from treating the idle wait as one very slow frame
+        self.clock.tick()
+        return events
@@ -1,46 +1,156 @@
 import pygame
 import time
 import logging
+from photo_prefetcher import PhotoPrefetcher
+from photo_decoder import decode_photo, fit_size
+from ken_burns import MotionPhoto, MOTION_PATHS, scale_to
+from display_format import convert_photo, surface_bytes, full_color_bytes
+from frame_metrics import metrics
 
 class Slideshow:
-    def __init__(self, screen, photo_manager, transition_time):
+    def __init__(self, screen, photo_manager, transition_time, prefetch_count=2, rendition_cache=None,
+                 surface_cache=None, fade_duration=1.7, max_photo_pixels=24000000,
+                 memory_profile='normal', motion=False, motion_zoom=1.25, motion_paths=None, motion_fps=15):
         print("Initializing Slideshow")
         self.screen = screen
         self.photo_manager = photo_manager
+        # Optional RenditionCache of photos already scaled to the screen
+        self.rendition_cache = rendition_cache
+        # Optional SurfaceCache keeping recently shown photos decoded in memory
+        self.surface_cache = surface_cache
         self.transition_time = transition_time
+        # Seconds a crossfade takes, whatever frame rate is achieved
+        self.fade_duration = fade_duration
+        # Photos with more pixels than this are skipped instead of decoded
+        self.max_photo_pixels = max_photo_pixels
+        # 'low' keeps photos at 16 bits per pixel (see display_format)
+        self.memory_profile = memory_profile
+        # Ken Burns pan and zoom: photos are loaded motion_zoom times larger than the screen and
+        # become MotionPhoto objects, redrawn motion_fps times per second
+        self.motion = motion
+        self.motion_zoom = max(1.0, motion_zoom)
+        self.motion_paths = motion_paths or list(MOTION_PATHS)
+        self.motion_fps = motion_fps
+        self.motion_changed = False
+        self.last_motion_render = 0
+        # Set by the quality governor (see set_quality)
+        self.quality_fps = motion_fps
+        self.smooth_scaling = True
         self.current_photo = None
         self.next_photo = None
         self.alpha = 255
+        self.fade_start = 0
         self.last_change = 0
         self.transitioning = False
-        self.load_initial_photo()
+        self.waiting_for_photo = False
+        # Even the first photo is scanned for and decoded in the background, so the
+        # clock shows right away; the first transition fades it in from black
+        self.prefetcher = PhotoPrefetcher(photo_manager, self.load_and_scale_photo, prefetch_count)
+        self.prefetcher.start()
 
-    def load_initial_photo(self):
-        logging.info("Loading initial photo")
-        photo_path = self.photo_manager.get_random_photo()
-        if photo_path:
-            self.current_photo = self.load_and_scale_photo(photo_path)
-        else:
-            logging.error("Failed to load initial photo")
+    def stop(self):
+        self.prefetcher.stop()
 
     def load_and_scale_photo(self, photo_path):
-        logging.info(f"Loading and scaling photo: {photo_path}")
+        """
+        Return a photo scaled to the screen and converted to the display pixel format
+        (a MotionPhoto with its pyramid built, in motion mode), or None if it cannot be loaded.
+        """
+        with metrics.stage('photo_load'):
+            photo = self.load_photo(photo_path)
+            if photo is not None and self.motion:
+                photo = MotionPhoto.create(photo, fit_size(photo.get_size(), self.screen.get_size()),
+                                           self.motion_paths, self.motion_zoom)
+            return photo
+
+    def photo_size(self):
+        """Size photos are loaded to fit: the screen, or motion_zoom times larger in motion mode."""
+        width, height = self.screen.get_size()
+        if self.motion:
+            return int(width * self.motion_zoom), int(height * self.motion_zoom)
+        return width, height
+
+    def load_photo(self, photo_path):
+        screen_size = self.photo_size()
+        if self.surface_cache is not None:
+            photo = self.surface_cache.get((photo_path, screen_size))
+            if photo is not None:
+                logging.info("Reusing decoded photo: %s", photo_path)
+                return photo
+
+        if self.rendition_cache is not None:
+            photo = self.rendition_cache.get(photo_path, screen_size)
+            if photo is not None:
+                logging.info("Loaded cached rendition of photo: %s", photo_path)
+                photo = self.convert_photo(photo)
+                if self.surface_cache is not None:
+                    self.surface_cache.put((photo_path, screen_size), photo)
+                return photo
+
+        logging.info("Loading and scaling photo: %s", photo_path)
+        smooth_scaling = self.smooth_scaling
         try:
-            photo = pygame.image.load(photo_path)
-            return self.scale_photo(photo)
-        except pygame.error as e:
+            photo = self.scale_photo(decode_photo(photo_path, screen_size, self.max_photo_pixels), screen_size,
+                                     smooth_scaling)
+            # Renditions scaled at a lower quality tier are not kept for good
+            if self.rendition_cache is not None and smooth_scaling:
+                self.rendition_cache.put(photo_path, screen_size, photo)
+            photo = self.convert_photo(photo)
+            if self.surface_cache is not None:
+                self.surface_cache.put((photo_path, screen_size), photo)
+            return photo
+        except (pygame.error, OSError, ValueError) as e:
             logging.error(f"Error loading image {photo_path}: {e}")
             return None
 
-    def scale_photo(self, photo):
-        screen_rect = self.screen.get_rect()
+    def convert_photo(self, photo):
+        """Convert a photo to the pixel format of the memory profile (see display_format.convert_photo)."""
+        return convert_photo(photo, self.screen, self.memory_profile)
+
+    def memory_usage(self):
+        """
+        Get the pixel memory of the photos held (current, incoming and cached).
+
+        Returns:
+            tuple: (bytes used, bytes the same photos would use at 32 bits per pixel)
+        """
+        photos = {}
+        for photo in (self.current_photo, self.next_photo):
+            if isinstance(photo, MotionPhoto):
+                photos.update((id(surface), surface) for surface in photo.surfaces())
+            elif photo is not None:
+                photos[id(photo)] = photo
+        if self.surface_cache is not None:
+            photos.update((id(photo), photo) for photo in self.surface_cache.surfaces())
+        return (sum(surface_bytes(photo) for photo in photos.values()),
+                sum(full_color_bytes(photo) for photo in photos.values()))
+
+    def log_memory(self):
+        used, full_color = self.memory_usage()
+        logging.info("Photos use %.1f MB (%s memory profile, %.1f MB saved against 32-bit surfaces)",
+                     used / (1024 * 1024), self.memory_profile, (full_color - used) / (1024 * 1024))
+
+    def set_quality(self, fps, smooth_scaling):
+        """Apply a quality tier: cap the motion frame rate, and pick smoothscale or the faster plain scaler."""
+        self.quality_fps = fps
+        self.smooth_scaling = smooth_scaling
+
+    def animating(self):
+        """Return True while frames change on their own (a crossfade, or a moving photo)."""
+        return self.transitioning or (self.motion and self.current_photo is not None)
+
+    def scale_photo(self, photo, size=None, smooth=True):
+        screen_rect = self.screen.get_rect() if size is None else pygame.Rect((0, 0), size)
         photo_rect = photo.get_rect()
         
         scale = min(screen_rect.width / photo_rect.width, screen_rect.height / photo_rect.height)
         new_width = int(photo_rect.width * scale)
         new_height = int(photo_rect.height * scale)
+        if (new_width, new_height) == photo_rect.size:
+            # Already decoded at the right size
+            return photo
         
-        scaled_photo = pygame.transform.smoothscale(photo, (new_width, new_height))
+        scaled_photo = scale_to(photo, (new_width, new_height), smooth=smooth)
         return scaled_photo
 
     def update(self):
@@ -50,7 +160,9 @@ class Slideshow:
             self.start_transition()
 
         if self.transitioning and self.next_photo:
-            self.alpha -= 5  # Adjust for smoother/faster transition
+            # Fade by elapsed time, so slow frames skip ahead instead of stretching the fade
+            progress = (current_time - self.fade_start) / self.fade_duration if self.fade_duration > 0 else 1
+            self.alpha = max(0, 255 - int(255 * progress))
             if self.alpha <= 0:
                 self.current_photo = self.next_photo
                 self.next_photo = None
@@ -58,39 +170,107 @@ class Slideshow:
                 self.last_change = current_time
                 self.transitioning = False
 
+        if self.motion:
+            # The fade runs at the tier's frame rate, the motion at most at motion_fps; a photo
+            # that has not been drawn yet renders its first frame at once
+            due = current_time - self.last_motion_render >= self.motion_frame_time()
+            with metrics.stage('motion'):
+                # Only the photos on screen move; each renders into its own reused frame surface
+                for photo in (self.current_photo, self.next_photo if self.transitioning else None):
+                    if (photo is not None and (due or photo.last_progress is None)
+                            and photo.render(current_time, self.smooth_scaling)):
+                        self.motion_changed = True
+            if due:
+                self.last_motion_render = current_time
+
+    def motion_frame_time(self):
+        return 1 / min(self.motion_fps, self.quality_fps)
+
+    def time_until_change(self):
+        """
+        Return the seconds until the next frame is needed (0 while transitioning),
+        or None while waiting for the prefetcher, which posts PHOTO_READY when done,
+        with no photo moving.
+        """
+        if self.transitioning:
+            return 0
+        # A moving photo keeps needing frames, even while the next photo is late
+        motion_frame = None
+        if isinstance(self.current_photo, MotionPhoto) and self.current_photo.moving():
+            motion_frame = self.motion_frame_time()
+        if self.waiting_for_photo:
+            return motion_frame
+        until_change = max(0, self.last_change + self.transition_time - time.time())
+        if motion_frame is not None:
+            return min(until_change, motion_frame)
+        return until_change
+
     def start_transition(self):
-        max_attempts = 5  # Try up to 5 times to get a valid photo
-        for _ in range(max_attempts):
-            logging.info("Attempting to get a new photo")
-            new_photo_path = self.photo_manager.get_random_photo()
-            if new_photo_path:
-                logging.info(f"New photo obtained: {new_photo_path}")
-                loaded_photo = self.load_and_scale_photo(new_photo_path)
-                if loaded_photo:
-                    try:
-                        self.next_photo = loaded_photo
-                        self.transitioning = True
-                    except Exception as e:
-                        logging.error(f"Error loading new photo: {e}")
-                    return
-            else:
-                logging.warning("Failed to get new photo")
-        logging.warning("Failed to get a valid photo after multiple attempts")
+        ready_photo = self.prefetcher.get_photo()
+        if ready_photo is None:
+            if not self.waiting_for_photo:
+                logging.info("Waiting for the next photo to be prefetched")
+            self.waiting_for_photo = True
+            return
+
+        self.waiting_for_photo = False
+        new_photo_path, loaded_photo = ready_photo
+        logging.info("New photo obtained: %s", new_photo_path)
+        self.next_photo = loaded_photo
+        self.alpha = 255
+        self.fade_start = time.time()
+        self.transitioning = True
+        if isinstance(loaded_photo, MotionPhoto):
+            # Move from the start of its fade in to the end of its fade out
+            loaded_photo.start(self.fade_start, self.transition_time + self.fade_duration * 2)
+            logging.debug("Photo motion: %s", loaded_photo.path)
+
+    def photo_position(self, photo):
+        """Return the top-left position that centers a photo on the screen."""
+        photo_rect = photo.get_rect()
+        screen_rect = self.screen.get_rect()
+        return ((screen_rect.width - photo_rect.width) // 2,
+                (screen_rect.height - photo_rect.height) // 2)
+
+    @staticmethod
+    def photo_surface(photo):
+        """Return the surface showing a photo (the current frame of a MotionPhoto)."""
+        return photo.frame if isinstance(photo, MotionPhoto) else photo
+
+    def set_layers(self, compositor):
+        """Publish the current photo and the incoming photo as compositor layers."""
+        if self.current_photo:
+            compositor.set_layer('background', self.photo_surface(self.current_photo),
+                                 self.photo_position(self.current_photo))
+        else:
+            compositor.set_layer('background', None)
+
+        if self.transitioning and self.next_photo:
+            compositor.set_layer('transition', self.photo_surface(self.next_photo),
+                                 self.photo_position(self.next_photo), alpha=255 - self.alpha)
+        else:
+            compositor.set_layer('transition', None)
+
+        if self.motion_changed:
+            # Moving photos redraw into the same surfaces, which the compositor cannot notice by itself
+            for photo in (self.current_photo, self.next_photo if self.transitioning else None):
+                if photo is not None:
+                    compositor.invalidate(photo.get_rect(topleft=self.photo_position(photo)))
+            self.motion_changed = False
 
     def draw(self):
-        logging.debug(f"Drawing slideshow. Current photo: {self.current_photo}, Transitioning: {self.transitioning}")
+        logging.debug("Drawing slideshow. Current photo: %s, Transitioning: %s", self.current_photo, self.transitioning)
         if self.current_photo:
             photo_rect = self.current_photo.get_rect()
             screen_rect = self.screen.get_rect()
             photo_pos = ((screen_rect.width - photo_rect.width) // 2,
                          (screen_rect.height - photo_rect.height) // 2)
-            self.screen.blit(self.current_photo, photo_pos)
+            self.screen.blit(self.photo_surface(self.current_photo), photo_pos)
         
         if self.transitioning and self.next_photo:
-            next_photo = self.next_photo.copy()
-            next_photo.set_alpha(255 - self.alpha)
-            photo_rect = next_photo.get_rect()
-            screen_rect = self.screen.get_rect()
-            photo_pos = ((screen_rect.width - photo_rect.width) // 2,
-                         (screen_rect.height - photo_rect.height) // 2)
-            self.screen.blit(next_photo, photo_pos)
\ No newline at end of file
+            # Blit with a temporary surface alpha instead of copying the photo every frame
+            next_surface = self.photo_surface(self.next_photo)
+            previous_alpha = next_surface.get_alpha()
+            next_surface.set_alpha(255 - self.alpha)
+            self.screen.blit(next_surface, self.photo_position(self.next_photo))
+            next_surface.set_alpha(previous_alpha)
\ No newline at end of file
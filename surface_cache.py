@@ -0,0 +1,91 @@
+import collections
+import threading
+import logging
+
+class SurfaceCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        In-memory LRU cache of decoded, scaled photo surfaces.
+
+        The cache is bounded by the total pixel bytes of the surfaces it
+        holds rather than by a number of entries, so the same setting means
+        the same RAM whatever the screen resolution. Hit, miss and eviction
+        counters are kept for tuning max_bytes.
+
+        Args:
+            max_bytes: upper bound for the pixel bytes held, 0 to disable the cache
+        """
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # key -> (surface, size in bytes), least recently used first
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return the cached surface for a key, or None on a miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, surface):
+        """Add a surface, evicting the least recently used ones to stay under max_bytes."""
+        size = surface.get_pitch() * surface.get_height()
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self.entries[key] = (surface, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def surfaces(self):
+        """Return a list of the cached surfaces."""
+        with self.lock:
+            return [surface for surface, _ in self.entries.values()]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: entries, bytes, max_bytes, hits, misses, evictions and hit_rate
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def log_stats(self):
+        stats = self.stats()
+        logging.info(f"Surface cache: {stats['entries']} surfaces, "
+                     f"{stats['bytes'] // (1024 * 1024)} of {stats['max_bytes'] // (1024 * 1024)} MB, "
+                     f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions "
+                     f"({stats['hit_rate']:.0%} hit rate)")
@@ -0,0 +1,139 @@
+import math
+import pygame
+import logging
+
+# Number of Font objects kept alive at once (the layout search probes several sizes)
+MAX_FONTS = 24
+# Number of layout plans kept (one per text length, screen size and orientation)
+MAX_PLANS = 16
+# Fraction of the screen the text block may fill, leaving a margin around it
+WIDTH_FILL = 0.95
+HEIGHT_FILL = 0.9
+# Hiragana and Japanese punctuation are full-width, so one character measures them all
+REFERENCE_CHAR = "あ"
+
+_fonts = {}
+_plans = {}
+
+def get_font(font_path, font_size):
+    """Get a shared pygame font for a font file and size, creating it on first use."""
+    key = (font_path, font_size)
+    font = _fonts.get(key)
+    if font is None:
+        if len(_fonts) >= MAX_FONTS:
+            # Drop the oldest font
+            del _fonts[next(iter(_fonts))]
+        font = pygame.font.Font(font_path, font_size)
+        _fonts[key] = font
+    return font
+
+def border_width_for(font_size):
+    """Border width used for a font size (scales with the font, at least 2 pixels)."""
+    return max(2, int(font_size * 0.05))
+
+def largest_fitting_size(fits, high):
+    """Binary search the largest size in [1, high] for which fits(size) is true (1 if none is)."""
+    low = 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+class LayoutPlan:
+    def __init__(self, orientation, font_size, border_width, chunk_length, xs, ys, cell_size):
+        """
+        Where every line or column of the clock text goes on screen.
+
+        A plan depends only on the text length, screen size, orientation and
+        font, so it is computed once and reused every minute.
+
+        Args:
+            orientation: "horizontal" or "vertical"
+            font_size: largest font size that fits
+            border_width: outline width for that size
+            chunk_length: characters per line (horizontal) or per column (vertical)
+            xs: left edge of each column (vertical); empty for horizontal, where lines are centered
+            ys: top edge of each line (horizontal) or each row of characters (vertical)
+            cell_size: (width, height) of one bordered full-width character
+        """
+        self.orientation = orientation
+        self.font_size = font_size
+        self.border_width = border_width
+        self.chunk_length = chunk_length
+        self.xs = xs
+        self.ys = ys
+        self.cell_size = cell_size
+
+    def chunks(self, text):
+        """Split text into the plan's lines or columns."""
+        return [text[i:i + self.chunk_length] for i in range(0, len(text), self.chunk_length)]
+
+def cell_size(font, border_width, length=1):
+    width, height = font.size(REFERENCE_CHAR * length)
+    return width + border_width * 2, height + border_width * 2
+
+def plan_horizontal(font_path, length, screen_width, screen_height):
+    # Choose the line length so the text block roughly matches the screen's aspect ratio
+    chars_per_line = max(int((length * screen_width / screen_height) ** 0.5), 10)
+    line_count = math.ceil(length / chars_per_line)
+
+    def fits(font_size):
+        line_width, line_height = cell_size(get_font(font_path, font_size), border_width_for(font_size),
+                                            min(chars_per_line, length))
+        return line_width <= screen_width * WIDTH_FILL and line_count * line_height <= screen_height * HEIGHT_FILL
+
+    font_size = largest_fitting_size(fits, screen_height)
+    border_width = border_width_for(font_size)
+    cell = cell_size(get_font(font_path, font_size), border_width)
+
+    # Distribute the lines evenly down the screen
+    line_height = cell[1]
+    padding = (screen_height - line_count * line_height) / (line_count + 1)
+    ys = [padding + i * (line_height + padding) for i in range(line_count)]
+    return LayoutPlan("horizontal", font_size, border_width, chars_per_line, [], ys, cell)
+
+def plan_vertical(font_path, length, screen_width, screen_height):
+    # Choose the column length so the text block roughly matches the screen's aspect ratio
+    chars_per_column = max(int((length * screen_height / screen_width) ** 0.5), 10)
+    column_count = math.ceil(length / chars_per_column)
+    rows = min(chars_per_column, length)
+
+    def fits(font_size):
+        width, height = cell_size(get_font(font_path, font_size), border_width_for(font_size))
+        return column_count * width <= screen_width * WIDTH_FILL and rows * height <= screen_height * HEIGHT_FILL
+
+    font_size = largest_fitting_size(fits, screen_height)
+    border_width = border_width_for(font_size)
+    cell = cell_size(get_font(font_path, font_size), border_width)
+
+    # Columns run right to left, characters top to bottom, evenly spaced
+    horizontal_padding = (screen_width - column_count * cell[0]) / (column_count + 1)
+    vertical_spacing = (screen_height - rows * cell[1]) / (rows + 1)
+    xs = [screen_width - (i + 1) * (cell[0] + horizontal_padding) for i in range(column_count)]
+    ys = [vertical_spacing + i * (cell[1] + vertical_spacing) for i in range(rows)]
+    return LayoutPlan("vertical", font_size, border_width, chars_per_column, xs, ys, cell)
+
+def get_layout_plan(font_path, length, screen_width, screen_height, orientation="horizontal"):
+    """
+    Get the memoized layout plan for a text length, screen size and orientation.
+
+    The font size is the largest whose real metrics fit the screen, found by
+    binary search over font.size() of full-width characters.
+    """
+    key = (font_path, length, screen_width, screen_height, orientation)
+    plan = _plans.get(key)
+    if plan is None:
+        if len(_plans) >= MAX_PLANS:
+            # Drop the oldest plan
+            del _plans[next(iter(_plans))]
+        if orientation == "vertical":
+            plan = plan_vertical(font_path, length, screen_width, screen_height)
+        else:
+            plan = plan_horizontal(font_path, length, screen_width, screen_height)
+        logging.debug("Layout plan for %d characters at %dx%d %s: font size %d",
+                      length, screen_width, screen_height, orientation, plan.font_size)
+        _plans[key] = plan
+    return plan
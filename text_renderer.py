@@ -0,0 +1,122 @@
+import time
+import pygame
+from glyph_atlas import get_glyph_atlas
+from text_layout import get_layout_plan
+from outline import outline, shadow_for
+from frame_metrics import metrics
+
+# Define colors
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+def render_text_with_border(font, text, text_color, border_color, border_width):
+    """
+    Render text with a border/outline effect.
+
+    Args:
+        font: pygame font object
+        text: string to render
+        text_color: RGB tuple for the main text color
+        border_color: RGB tuple for the border color
+        border_width: width of the border in pixels
+
+    Returns:
+        pygame surface with bordered text
+    """
+    text_surface = font.render(text, True, text_color)
+
+    # Dilate the text rendered in the border color into a surface large enough for text + border
+    bordered_surface = outline(font.render(text, True, border_color), border_width)
+
+    # Render the main text on top in the center
+    bordered_surface.blit(text_surface, (border_width, border_width))
+
+    return bordered_surface
+
+def render_vertical_text(screen, combined_text, font_path, screen_width, screen_height, shadow=False, bordered=True):
+    """
+    Render text vertically in traditional Japanese style (top-to-bottom, right-to-left).
+
+    Args:
+        screen: pygame screen surface
+        combined_text: the full text string to render
+        font_path: path to the font file
+        screen_width: width of the screen
+        screen_height: height of the screen
+        shadow: draw a soft shadow behind the text
+        bordered: False draws plain text, without border or shadow, in the same place
+    """
+    layout_start = time.perf_counter()
+    plan = get_layout_plan(font_path, len(combined_text), screen_width, screen_height, "vertical")
+    atlas = get_text_atlas(font_path, plan, shadow, bordered)
+    # Plain glyphs are smaller than the cells laid out for bordered ones
+    inset = plan.border_width - atlas.border_width
+    metrics.record('layout', time.perf_counter() - layout_start)
+
+    with metrics.stage('text_render'):
+        char_width = plan.cell_size[0]
+        # Draw each column from right to left, each character from top to bottom
+        for column_x, column in zip(plan.xs, plan.chunks(combined_text)):
+            for char_y, char in zip(plan.ys, column):
+                char_surface = atlas.render_glyph(char)
+                # Center the character horizontally within the column
+                char_x = column_x + (char_width - atlas.glyph_size(char)[0]) // 2
+                screen.blit(char_surface, (char_x, char_y + inset))
+
+def render_horizontal_text(screen, combined_text, font_path, screen_width, screen_height, shadow=False, bordered=True):
+    """
+    Render text horizontally (left-to-right, top-to-bottom).
+
+    Args:
+        screen: pygame surface to draw on
+        combined_text: the full text string to render
+        font_path: path to the font file
+        screen_width: width of the screen
+        screen_height: height of the screen
+        shadow: draw a soft shadow behind the text
+        bordered: False draws plain text, without border or shadow, in the same place
+    """
+    layout_start = time.perf_counter()
+    plan = get_layout_plan(font_path, len(combined_text), screen_width, screen_height, "horizontal")
+    atlas = get_text_atlas(font_path, plan, shadow, bordered)
+    inset = plan.border_width - atlas.border_width
+    metrics.record('layout', time.perf_counter() - layout_start)
+
+    with metrics.stage('text_render'):
+        # Draw each line centered horizontally, at the plan's evenly spaced heights
+        for line_y, line in zip(plan.ys, plan.chunks(combined_text)):
+            line_surface = atlas.render_line(line)
+            line_x = (screen_width - atlas.line_size(line)[0]) // 2
+            screen.blit(line_surface, (line_x, line_y + inset))
+
+def get_text_atlas(font_path, plan, shadow, bordered):
+    if not bordered:
+        return get_glyph_atlas(font_path, plan.font_size, WHITE, BLACK, 0)
+    return get_glyph_atlas(font_path, plan.font_size, WHITE, BLACK, plan.border_width,
+                           shadow_for(plan.border_width) if shadow else None)
+
+def render_text_layer(combined_text, font_path, screen_width, screen_height, text_orientation="horizontal",
+                      shadow=False, bordered=True):
+    """
+    Render the clock text into a transparent, screen-sized layer.
+
+    Args:
+        combined_text: the full text string to render
+        font_path: path to the font file
+        screen_width: width of the screen
+        screen_height: height of the screen
+        text_orientation: "horizontal" or "vertical"
+        shadow: draw a soft shadow behind the text
+        bordered: False draws plain text without border or shadow, which is cheaper to draw over photos
+
+    Returns:
+        pygame surface with per-pixel alpha
+    """
+    text_layer = pygame.Surface((screen_width, screen_height), pygame.SRCALPHA)
+    if text_orientation == "vertical":
+        # Traditional Japanese vertical text (top-to-bottom, right-to-left)
+        render_vertical_text(text_layer, combined_text, font_path, screen_width, screen_height, shadow, bordered)
+    else:
+        # Horizontal text (left-to-right, top-to-bottom)
+        render_horizontal_text(text_layer, combined_text, font_path, screen_width, screen_height, shadow, bordered)
+    return text_layer
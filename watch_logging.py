@@ -0,0 +1,94 @@
+import queue
+import threading
+import atexit
+import logging
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, interval=60, max_tracked=1000, level=logging.WARNING):
+        """
+        Let an identical message through at most once per interval.
+
+        The first occurrence after a quiet interval is passed with a note
+        of how many copies were dropped in between. Records below level
+        (routine messages such as each transition) are always passed.
+
+        Args:
+            interval: seconds during which repeats of a message are dropped
+            max_tracked: number of distinct messages remembered before the oldest are forgotten
+            level: lowest level of the records that are rate limited
+        """
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self.max_tracked = max_tracked
+        # (level, message) -> [time last passed, copies dropped since]
+        self.seen = {}
+        # Records are filtered on whichever thread logs them
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+        key = (record.levelno, record.getMessage())
+        with self.lock:
+            return self.check(key, record)
+
+    def check(self, key, record):
+        entry = self.seen.get(key)
+        if entry is not None and record.created - entry[0] < self.interval:
+            entry[1] += 1
+            return False
+
+        if entry is not None and entry[1]:
+            record.msg = f"{record.getMessage()} ({entry[1]} identical messages suppressed)"
+            record.args = None
+        if len(self.seen) >= self.max_tracked:
+            # Forget the oldest half instead of growing without bound
+            for old_key in sorted(self.seen, key=lambda k: self.seen[k][0])[:self.max_tracked // 2]:
+                del self.seen[old_key]
+        self.seen[key] = [record.created, 0]
+        return True
+
+def setup_logging(filename='watch.log', level=logging.INFO, max_bytes=1024 * 1024, backup_count=3,
+                  rate_limit_interval=60):
+    """
+    Send log records through a queue to a writer thread.
+
+    Callers only enqueue records, so a slow SD card never blocks a frame.
+    The writer thread appends to a rotating log file, so the log cannot
+    fill the card, and identical warnings and errors are rate limited
+    before they are queued.
+
+    Args:
+        filename: log file path
+        level: root logger level
+        max_bytes: size at which the log file is rotated, 0 to never rotate
+        backup_count: number of rotated files kept
+        rate_limit_interval: seconds during which repeats of a warning or error are dropped, 0 to keep all
+
+    Returns:
+        the running logging.handlers.QueueListener (stopped automatically at exit)
+    """
+    file_handler = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count,
+                                                        encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    if rate_limit_interval > 0:
+        queue_handler.addFilter(RateLimitFilter(rate_limit_interval))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    # Flush whatever is still queued before logging shuts down
+    atexit.register(listener.stop)
+    return listener